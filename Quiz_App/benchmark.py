@@ -0,0 +1,274 @@
+"""
+benchmark.py
+----------------------
+A reproducible benchmark of the Quiz Game's storage, ranking and question
+paths.
+
+Synthetic users databases of each requested size are generated from a
+fixed seed (and kept in the data directory for later runs). Against a
+scratch copy of each, the suite measures:
+
+    load              opening an existing database and counting its users
+    cold_login        looking up one user in a database just opened, as the first login does
+    login_lookup      looking up a user and checking a legacy plaintext password
+    signup_check      checking that a new username is free, as the signup screen does
+    score_update      buffering a correct answer's points and flushing them to disk
+    leaderboard_prep  the count, rank and visible rows the leaderboard screen loads
+    question_decode   decoding an API question and shuffling its answers for display
+    password_check    checking a password against a hash made with the configured scrypt cost
+
+Each path reports its throughput and its p50 and p99 latency. A run can be
+saved as the baseline; later runs are compared against it and the script
+exits with 1 if the p50 latency of any path got slower than the tolerance
+allows. Throughput and p99 are reported but not gated, since fsync and
+scheduler noise make them vary too much between runs.
+
+Usage:
+    python benchmark.py [--backend json|sqlite|sharded] [--sizes 1000 100000 1000000] [--save]
+                        [--baseline benchmark_baseline.json] [--tolerance 0.5]
+
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from passwords import hash_password, verify_password
+from question import Question
+from quizSession import POINTS_PER_CORRECT_ANSWER, QuizSession
+from userStore import JsonUserStore, ScoreBuffer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SEED = 1234
+
+# Iterations per path; writes are fsynced, so they get fewer
+ITERATIONS = {
+    "load": 3,
+    "cold_login": 20,
+    "login_lookup": 10000,
+    "signup_check": 10000,
+    "score_update": 200,
+    "leaderboard_prep": 2000,
+    "question_decode": 20000,
+    "password_check": 10,
+}
+
+# Fraction of each path's iterations run untimed first, to warm caches
+WARMUP = 0.1
+
+# Rows the leaderboard screen shows at once
+VISIBLE_ROWS = 12
+
+
+def generate_users(path, n):
+    """Writes a users snapshot with n synthetic users, in the format of users.json."""
+    rng = random.Random(SEED)
+    data = [{"username": f"user{i:07d}", "password": f"pw{i}", "points": rng.randrange(1000) * 10}
+            for i in range(n)]
+    with open(path, "w") as file:
+        json.dump({"generation": 0, "data": data}, file, indent=4)
+
+
+def users_file(data_dir, n) -> str:
+    """Returns the synthetic snapshot for n users, generating it on first use."""
+    path = os.path.join(data_dir, f"users_{n}.json")
+    if not os.path.exists(path):
+        print(f"Generating {n} users...")
+        generate_users(path, n)
+    return path
+
+
+def open_store(backend, source, scratch):
+    """Opens a store of the given backend over a scratch copy of a snapshot."""
+    if backend == "json":
+        path = os.path.join(scratch, "users.json")
+        if not os.path.exists(path):
+            shutil.copy(source, path)
+        return JsonUserStore(path)
+    if backend == "sharded":
+        from shardedUserStore import ShardedUserStore
+        return ShardedUserStore(os.path.join(scratch, "shards"), import_from=source)
+
+    from sqliteUserStore import SqliteUserStore
+    return SqliteUserStore(os.path.join(scratch, "users.db"), import_from=source)
+
+
+def timed(func, iterations) -> dict:
+    """
+    Calls func(i) for i in range(iterations), timing every call after an untimed warmup.
+
+    Returns:
+        dict: Throughput in operations per second, and p50 and p99 latency in microseconds.
+    """
+    for i in range(int(iterations * WARMUP)):
+        func(i)
+
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        func(i)
+        samples.append(time.perf_counter_ns() - start)
+
+    samples.sort()
+    total = sum(samples) or 1
+    return {
+        "ops_per_sec": iterations / (total / 1e9),
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000,
+    }
+
+
+def bench_store(backend, source, n) -> dict:
+    """Measures the user store paths against a database of n users."""
+    rng = random.Random(SEED)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # The first open copies or imports the snapshot and isn't timed
+        store = open_store(backend, source, scratch)
+        store.count()
+
+        def load(i):
+            open_store(backend, source, scratch).count()
+
+        results["load"] = timed(load, ITERATIONS["load"])
+        names = [f"user{rng.randrange(n):07d}" for _ in range(ITERATIONS["login_lookup"])]
+
+        def cold_login(i):
+            assert open_store(backend, source, scratch).get(names[i]) is not None
+
+        results["cold_login"] = timed(cold_login, ITERATIONS["cold_login"])
+
+        def login_lookup(i):
+            user = store.get(names[i])
+            assert user is not None and verify_password("pw" + str(int(names[i][4:])), user["password"])
+
+        def signup_check(i):
+            assert not store.exists(f"newuser{i}")
+
+        buffer = ScoreBuffer(store)
+
+        def score_update(i):
+            buffer.add(names[i], POINTS_PER_CORRECT_ANSWER)
+            buffer.flush()
+
+        offsets = [rng.randrange(max(n - VISIBLE_ROWS, 1)) for _ in range(ITERATIONS["leaderboard_prep"])]
+
+        def leaderboard_prep(i):
+            store.count()
+            store.rank(names[i])
+            store.ranked(offsets[i], offsets[i] + VISIBLE_ROWS)
+
+        results["login_lookup"] = timed(login_lookup, ITERATIONS["login_lookup"])
+        results["signup_check"] = timed(signup_check, ITERATIONS["signup_check"])
+        results["score_update"] = timed(score_update, ITERATIONS["score_update"])
+        results["leaderboard_prep"] = timed(leaderboard_prep, ITERATIONS["leaderboard_prep"])
+
+        if backend == "sqlite":
+            store.conn.close()
+
+    return results
+
+
+def bench_questions() -> dict:
+    """Measures decoding API questions and preparing them for display."""
+    raw = [{
+        "type": "multiple", "difficulty": "easy", "category": "General Knowledge",
+        "question": f"Which of these is &quot;answer {i}&quot;?",
+        "correct_answer": f"Answer {i} &amp; more",
+        "incorrect_answers": [f"Wrong &#039;{i}a&#039;", f"Wrong {i}b", f"Wrong {i}c"],
+    } for i in range(ITERATIONS["question_decode"])]
+    rng = random.Random(SEED)
+
+    def question_decode(i):
+        QuizSession([Question.from_api(raw[i], 9)], rng=rng).next_question()
+
+    return {"question_decode": timed(question_decode, ITERATIONS["question_decode"])}
+
+
+def bench_passwords() -> dict:
+    """Measures the password check a login does once the user's password is hashed."""
+    stored = hash_password("benchmark password")
+
+    def password_check(i):
+        assert verify_password("benchmark password", stored)
+
+    return {"password_check": timed(password_check, ITERATIONS["password_check"])}
+
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Compares a run with the baseline.
+
+    Returns:
+        list: A message for every path that got slower, empty if none did.
+    """
+    problems = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if result["p50_us"] > old["p50_us"] * (1 + tolerance):
+            problems.append(f"{name}: p50 {result['p50_us']:.1f} us, baseline {old['p50_us']:.1f} us")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Quiz Game's storage, ranking and question paths.")
+    parser.add_argument("--backend", choices=["json", "sqlite", "sharded"], default="json")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "quiz_benchmark"))
+    parser.add_argument("--save", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--baseline", default=os.path.join(HERE, "benchmark_baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = {}
+    for n in args.sizes:
+        source = users_file(args.data_dir, n)
+        for path, result in bench_store(args.backend, source, n).items():
+            results[f"{args.backend}/{n}/{path}"] = result
+    for path, result in bench_questions().items():
+        results[f"questions/{path}"] = result
+    for path, result in bench_passwords().items():
+        results[f"passwords/{path}"] = result
+
+    print(f"{'path':36} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for name, result in results.items():
+        print(f"{name:36} {result['ops_per_sec']:12.0f} {result['p50_us']:10.1f} {result['p99_us']:10.1f}")
+
+    if args.save:
+        try:
+            with open(args.baseline, "r") as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            baseline = {}
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+        print("No baseline yet, run with --save to record one.")
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+config.py
+----------------------
+This module holds the settings shared by the Quiz Game screens.
+
+"""
+
+# Where registered users are stored: "json", "sqlite", "sharded" (JSON
+# files split by username, see shardedUserStore.py) or "remote" (a quiz
+# server shared by several clients, see quizServer.py)
+STORAGE_BACKEND = "json"
+
+# Path of the JSON file holding the registered users
+USERS_FILE = "users.json"
+
+# Path of the SQLite database used by the "sqlite" backend. When it is
+# created, the users in USERS_FILE are imported into it.
+SQLITE_FILE = "users.db"
+
+# Directory and number of shard files used by the "sharded" backend. When
+# the directory is created, the users in USERS_FILE are imported into it.
+# To change the number of shards later, run "python shardedUserStore.py
+# migrate" into a new directory.
+SHARDS_DIR = "users_shards"
+SHARD_COUNT = 8
+
+# How often (in milliseconds) an open leaderboard checks the users database
+# for new scores when it can't be notified of changes (no inotify)
+LIVE_POLL_INTERVAL_MS = 1000
+
+# How often (in milliseconds) an open leaderboard re-reads the rankings from
+# the quiz server with the "remote" backend, where each check is a request
+REMOTE_POLL_INTERVAL_MS = 5000
+
+# How often (in milliseconds) buffered score points are written to disk
+# while a quiz is running. Points are also written when the quiz ends.
+SCORE_FLUSH_INTERVAL_MS = 30000
+
+# Number of events the users journal may hold before it is folded back
+# into the users.json snapshot
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# Path of the on-disk cache of downloaded questions
+QUESTION_CACHE_FILE = "question_cache.json"
+
+# Seconds a cached question set is served before it is fetched again.
+# Older sets are still used when the API can't be reached.
+QUESTION_CACHE_TTL = 60 * 60
+
+# Maximum number of (category, difficulty, type) sets kept in the cache
+QUESTION_CACHE_SIZE = 50
+
+# Number of ready question sets kept per recently used (category, difficulty)
+PREFETCH_DEPTH = 1
+
+# Number of recently used or popular (category, difficulty) pairs that are
+# prefetched when the home screen opens
+PREFETCH_KEYS = 3
+
+# Base URL of the Open Trivia Database API
+TRIVIA_API_URL = "https://opentdb.com"
+
+# Minimum seconds between two API requests. The API allows one request
+# every 5 seconds per IP address.
+TRIVIA_RATE_LIMIT_INTERVAL = 5.0
+
+# How many times a rate-limited or failed API request is retried
+TRIVIA_MAX_RETRIES = 3
+
+# Path of the file holding each user's API session token and the hashes
+# of the questions they were already shown
+QUESTION_HISTORY_FILE = "question_history.json"
+
+# Maximum number of seen questions remembered per user
+SEEN_QUESTIONS_LIMIT = 5000
+
+# Where quiz questions come from: "api" (the Open Trivia Database, with
+# caching and prefetching), "bank" (the local question bank only) or
+# "server" (the quiz server)
+QUESTION_SOURCE = "api"
+
+# Path of the local question bank filled by "python questionBank.py import"
+QUESTION_BANK_FILE = "question_bank.jsonl"
+
+# Number of questions in a quiz; 0 plays a marathon that goes on until
+# the questions run out or the player goes back
+QUIZ_LENGTH = 10
+
+# Record timings and counters of the slow paths (API requests, user store
+# reads and writes, screen construction). Off by default; when off the
+# instrumentation does next to nothing.
+METRICS_ENABLED = False
+
+# File the metrics are exported to when the app closes
+METRICS_FILE = "metrics.jsonl"
+
+# Export format: "jsonl" (one snapshot per line) or "prometheus" (text
+# exposition format, replaced on every export)
+METRICS_FORMAT = "jsonl"
+
+# Address of the quiz server used by the "remote" backend and the
+# "server" question source
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+
+# Seconds a client waits for the quiz server to answer
+SERVER_TIMEOUT = 10.0
+
+# Seconds between the quiz server's batched score writes
+SERVER_FLUSH_INTERVAL = 0.5
+
+# Most points the quiz server accepts from a client in one request
+SERVER_MAX_POINTS_PER_REQUEST = 10000
+
+# Where the quiz server itself stores the users: "json", "sqlite" or "sharded"
+SERVER_STORAGE_BACKEND = "json"
+
+# Cost of the scrypt password hash: n is the CPU/memory cost (a power of
+# 2, using 128 * n * r bytes), r the block size and p the parallelism.
+# Run "python passwords.py" to time other values on this machine; stored
+# passwords are rehashed with new values on the user's next login.
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
@@ -2,48 +2,77 @@
 gameScreen.py
 ----------------------
 This module defines the GameScreen class for a Flashcard App using the CustomTkinter library.
-It manages the quiz interface, handles question selection, user interaction, and scoring.
+It shows the quiz run by a QuizSession and passes the player's picks to it; the
+quiz logic itself lives in quizSession.py.
 
 """
 
+import threading
 import customtkinter as ctk
-import html
-import random
 from tkinter import messagebox
-import json
+from config import SCORE_FLUSH_INTERVAL_MS
+from questionHistory import get_history
+from quizSession import QuizSession
+from screenManager import Screen, run
+from userStore import ScoreBuffer, get_store
 
+# Milliseconds between checks for the next question while a batch is loading
+NEXT_QUESTION_POLL_MS = 100
 
-class GameScreen(ctk.CTk):
+
+class GameScreen(Screen):
     """
     GameScreen class represents the flashcard quiz interface.
 
     Attributes:
-        question_lst (list): A list of quiz questions.
+        session (QuizSession): The quiz being played.
         curUser (dict): The current user details.
     """
 
-    def __init__(self, question_lst, curUser):
+    window_title = "Flashcard App"
+    window_size = "700x500"
+    window_resizable = True
+
+    def __init__(self, app):
         """
-        Initializes the game screen with questions and user data.
+        Builds the game screen. A quiz starts each time the screen is shown.
 
         Args:
-            question_lst (list): List of questions from the database.
-            curUser (dict): Dictionary containing user details.
+            app (App): The root window showing the screen.
         """
-        super().__init__()
+        super().__init__(app)
+
+        self.session = None
+        self.curUser = None
+        self.score_buffer = ScoreBuffer(get_store())
+        self.flush_job = None
+        self.wait_job = None
 
-        self.title("Flashcard App")
-        self.geometry("700x500")
+        self.init_GUI()
+
+    def on_show(self, questions, curUser):
+        """
+        Starts a new quiz.
 
-        self.question_lst = question_lst
-        self.cur_question = ""
-        self.correct_answer = ""
-        self.wrong_answers = []
-        self.q_index = 0
+        Args:
+            questions (QuestionStream): Serves the quiz's Question records and
+                loads more in the background as they are used up.
+            curUser (dict): Dictionary containing user details.
+        """
         self.curUser = curUser
+        self.session = QuizSession(
+            questions, curUser["username"] if curUser else None,
+            on_points=self.score_buffer.add, on_finish=lambda session: self.flush_score()
+        )
 
-        self.init_GUI()
         self.correct_index = self.update_GUI()
+        self.schedule_flush()
+
+    def on_hide(self):
+        """Writes any buffered points when the quiz is left or the window is closed."""
+        self.cancel_wait()
+        self.cancel_flush()
+        self.flush_score()
 
     def init_GUI(self):
         """Initializes the graphical user interface components."""
@@ -103,40 +132,45 @@ class GameScreen(ctk.CTk):
         Returns:
             int: The index of the correct answer button.
         """
-        if self.q_index > 9:
+        self.wait_job = None
+        question = self.session.next_question()
+
+        if question is None and self.session.finished():
             self.qa_label.configure(text="Out of Questions! Please press Back to return to the home screen.")
+            for btn in [self.ans1_button, self.ans2_button, self.ans3_button, self.ans4_button]:
+                btn.configure(state="disabled")
             self.next_button.configure(state="disabled")
             return -1
 
-        self.cur_question = html.unescape(self.question_lst[self.q_index]['question'])
-        self.correct_answer = html.unescape(self.question_lst[self.q_index]['correct_answer'])
-        self.wrong_answers = [html.unescape(ans) for ans in self.question_lst[self.q_index]['incorrect_answers']]
-
-        self.qa_label.configure(text=self.cur_question)
+        if question is None:
+            # The next batch is still loading, check again shortly
+            self.qa_label.configure(text="Loading more questions...")
+            for btn in [self.ans1_button, self.ans2_button, self.ans3_button, self.ans4_button]:
+                btn.configure(text="", state="disabled")
+            self.next_button.configure(state="disabled")
+            self.wait_job = self.after(NEXT_QUESTION_POLL_MS, self.update_GUI)
+            return -1
 
-        btns = [self.ans1_button, self.ans2_button, self.ans3_button, self.ans4_button]
-        anss = self.wrong_answers + [self.correct_answer]
-        random.shuffle(anss)
-        random.shuffle(btns)
+        self.next_button.configure(state="normal")
+        self.qa_label.configure(text=question.text)
 
-        correct_bt_index = anss.index(self.correct_answer)
+        self.reset_buttons()
 
+        # True/false questions leave the last buttons without a choice
+        btns = [self.ans1_button, self.ans2_button, self.ans3_button, self.ans4_button]
         for i, btn in enumerate(btns):
-            btn.configure(text=anss[i])
+            if i < len(self.session.choices):
+                btn.configure(text=self.session.choices[i])
+            else:
+                btn.configure(text="", state="disabled")
 
-        self.q_index += 1
-        self.reset_buttons()
-        return correct_bt_index
+        return self.session.choices.index(question.correct_answer)
 
     def go_back(self):
         """Handles returning to the home screen."""
-        from homeScreen import HomeScreen
         if messagebox.askquestion("Quit", "Do you want to quit?") == "yes":
             print("Going back to previous screen")
-            self.quit()
-            self.destroy()
-            home_screen = HomeScreen(self.curUser)
-            home_screen.mainloop()
+            self.app.show("home", user=self.curUser)
 
     def check_answer(self, btn_id):
         """
@@ -145,31 +179,63 @@ class GameScreen(ctk.CTk):
         Args:
             btn_id (int): The button ID of the selected answer.
         """
+        if self.session is None or self.session.question is None:
+            return
+
         btn_map = {1: self.ans1_button, 2: self.ans2_button, 3: self.ans3_button, 4: self.ans4_button}
         ans = btn_map[btn_id].cget("text")
 
-        if ans == self.correct_answer:
+        if self.session.answer(ans):
             self.paint_Button("green", btn_id)
-            self.update_user_score()
         else:
             self.paint_Button("red", btn_id)
 
-    def update_user_score(self):
-        """Updates the user's score in the JSON file."""
-        try:
-            with open("users.json", "r") as file:
-                json_data = json.load(file)
-
-            for user in json_data["data"]:
-                if user["username"] == self.curUser["username"]:
-                    user["points"] += 10
-                    break
+    def flush_score(self):
+        """
+        Writes the buffered points to the user store in a single save, on a
+        worker thread so a slow store or quiz server never freezes the window.
 
-            with open("users.json", "w") as file:
-                json.dump(json_data, file, indent=4)
+        The thread is not a daemon, so a flush started as the window closes
+        still finishes before the program exits. Nothing on the screen waits
+        for it, so it doesn't go through BackgroundTask.
+        """
+        threading.Thread(target=self.write_score, name="score-flush").start()
 
+    def write_score(self):
+        """
+        Flushes the score buffer and the questions marked as seen. Runs on a
+        worker thread and never touches widgets.
+        """
+        try:
+            self.score_buffer.flush()
         except FileNotFoundError:
             print("File Not Found...")
+        except OSError as e:
+            print(f"Could not save the score, it will be retried: {e}")
+        except ValueError as e:
+            print(f"The score was rejected, it will be retried: {e}")
+        get_history().flush()
+
+    def schedule_flush(self):
+        """Schedules the next periodic flush of the score buffer."""
+        self.flush_job = self.after(SCORE_FLUSH_INTERVAL_MS, self.on_flush_timer)
+
+    def on_flush_timer(self):
+        """Flushes the score buffer and schedules the next flush."""
+        self.flush_score()
+        self.schedule_flush()
+
+    def cancel_flush(self):
+        """Cancels the pending periodic flush, if any."""
+        if self.flush_job is not None:
+            self.after_cancel(self.flush_job)
+            self.flush_job = None
+
+    def cancel_wait(self):
+        """Stops waiting for the next question to load, if it was."""
+        if self.wait_job is not None:
+            self.after_cancel(self.wait_job)
+            self.wait_job = None
 
     def paint_Button(self, color, bt_id):
         """Changes the button color after selection."""
@@ -183,5 +249,4 @@ class GameScreen(ctk.CTk):
 
 
 if __name__ == "__main__":
-    app = GameScreen()
-    app.mainloop()
+    run("login")
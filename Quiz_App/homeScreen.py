@@ -5,36 +5,66 @@ This module defines the HomeScreen class for a Quiz Game.
 It allows users to select a quiz category and difficulty, then fetches
 questions from the Open Trivia Database API.
 
-"""
+The request runs on a background thread so the window stays responsive,
+and the user can cancel it while it is loading. Downloaded questions are
+kept in an on-disk cache, which serves repeated quizzes and quizzes
+started while the API can't be reached. A background prefetcher keeps
+fresh question sets ready for recently used categories, so most quizzes
+start without waiting for the API at all. Questions the user has already
+been shown are filtered out.
+
+With QUESTION_SOURCE = "bank" in config.py, quizzes are served from the
+local question bank instead, without any network access.
 
-import requests
-from gameScreen import *
-from leaderboard import LeaderboardScreen
+"""
 
+import customtkinter as ctk
+from config import PREFETCH_KEYS, QUESTION_SOURCE, QUIZ_LENGTH
+from prefetch import get_prefetcher
+from questionCache import get_cache
+from questionHistory import get_history
+from questionStream import (QuestionStream, STREAM_BATCH_SIZE, load_batch, load_from_server, make_supply,
+                            sample_bank, filter_unseen)
+from screenManager import Screen, run
+from triviaApi import categories
+from worker import BackgroundTask
 
-categories = [
-    "General Knowledge", "Entertainment: Books", "Entertainment: Film",
-    "Entertainment: Music", "Entertainment: Musicals & Theatres", "Entertainment: Television",
-    "Entertainment: Video Games", "Entertainment: Board Games", "Science & Nature",
-    "Science: Computers", "Science: Mathematics", "Mythology", "Sports", "Geography",
-    "History", "Politics", "Art", "Celebrities", "Animals", "Vehicles",
-    "Entertainment: Comics", "Science: Gadgets", "Entertainment: Japanese Anime & Manga",
-    "Entertainment: Cartoon & Animations"
-]
+# Quiz lengths offered on the home screen; 0 is a marathon
+QUIZ_LENGTHS = [10, 20, 50, 0]
 
-class HomeScreen(ctk.CTk):
-    def __init__(self, connected_user):
-        super().__init__()
+class HomeScreen(Screen):
+    def __init__(self, app):
+        super().__init__(app)
 
-        self.title("Quiz Game")
-        self.geometry("400x500")
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure((0, 1, 2, 3, 4, 5), weight=1)
-        self.resizable(False, False)
 
         self.init_gui()
 
-        self.curUser = connected_user
+        self.curUser = None
+        self.owner = None
+        self.fetch_task = None
+
+    def on_show(self, user):
+        """
+        Shows the menu for a user.
+
+        Args:
+            user (dict): The logged-in user, or None.
+        """
+        self.curUser = user
+        self.owner = user["username"] if user else None
+        self.status_label.configure(text="")
+
+        if QUESTION_SOURCE == "api":
+            self.warm_prefetch()
+
+    def on_hide(self):
+        """Stops waiting for a question request that is still loading."""
+        if self.fetch_task is not None:
+            self.fetch_task.cancel()
+            self.fetch_task = None
+            self.set_loading(False)
 
 
     def init_gui(self):
@@ -54,96 +84,179 @@ class HomeScreen(ctk.CTk):
         self.bottom_frame = ctk.CTkFrame(self)
         self.bottom_frame.grid(row=2, column=0, rowspan=4, padx=10, pady=10, sticky="nsew")
         self.bottom_frame.grid_columnconfigure(0, weight=1)
-        self.bottom_frame.grid_rowconfigure((0, 1, 2, 3), weight=1)
+        self.bottom_frame.grid_rowconfigure((0, 1, 2, 3, 4), weight=1)
 
         # Category Dropdown
         self.category_option = ctk.CTkComboBox(
-            self.bottom_frame, values=categories, font=("Arial", 16), state="readonly"
+            self.bottom_frame, values=categories, font=("Arial", 16), state="readonly",
+            command=self.on_option_selected
         )
         self.category_option.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
         self.category_option.set("Pick a category:")
 
         # Difficulty Dropdown
         self.difficulty_option = ctk.CTkComboBox(
-            self.bottom_frame, values=["Easy", "Medium", "Hard"], font=("Arial", 16), state="readonly"
+            self.bottom_frame, values=["Easy", "Medium", "Hard"], font=("Arial", 16), state="readonly",
+            command=self.on_option_selected
         )
         self.difficulty_option.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
         self.difficulty_option.set("Pick a difficulty:")
 
+        # Quiz Length Dropdown
+        length_names = [self.length_name(length) for length in QUIZ_LENGTHS]
+        if self.length_name(QUIZ_LENGTH) not in length_names:
+            length_names.insert(0, self.length_name(QUIZ_LENGTH))
+        self.length_option = ctk.CTkComboBox(
+            self.bottom_frame, values=length_names, font=("Arial", 16), state="readonly"
+        )
+        self.length_option.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
+        self.length_option.set(self.length_name(QUIZ_LENGTH))
+
         # Start Button
         self.start_button = ctk.CTkButton(
             self.bottom_frame, text="Start Quiz", font=("Arial", 20), height=50, command=self.start_game
         )
-        self.start_button.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
+        self.start_button.grid(row=3, column=0, padx=10, pady=10, sticky="ew")
 
         # Status Label
         self.status_label = ctk.CTkLabel(self.bottom_frame, text="", font=("Arial", 20), text_color="red")
-        self.status_label.grid(row=3, column=0, padx=10, pady=10, sticky="ew")
+        self.status_label.grid(row=4, column=0, padx=10, pady=10, sticky="ew")
+
+    def warm_prefetch(self):
+        """Starts prefetching question sets for the popular and recently played categories."""
+        prefetcher = get_prefetcher()
+        prefetcher.owner = self.owner
+        keys = prefetcher.popular(PREFETCH_KEYS) + get_cache().recent(PREFETCH_KEYS)
+        for key in dict.fromkeys(keys):
+            prefetcher.prefetch(key)
+
+    def on_option_selected(self, choice=None):
+        """Starts prefetching as soon as both a category and a difficulty are picked."""
+        difficulty = self.difficulty_option.get().lower()
+        category = self.category_option.get()
+
+        if QUESTION_SOURCE == "api" and difficulty != "pick a difficulty:" and category != "Pick a category:":
+            get_prefetcher().prefetch((self.convert_category(category), difficulty, "multiple"))
 
     def open_leaderboard(self):
-        self.destroy()
-        leaderboard = LeaderboardScreen(self.curUser)
-        leaderboard.mainloop()
+        self.app.show("leaderboard", current_user=self.curUser)
 
     def start_game(self):
         difficulty = self.difficulty_option.get().lower()
         category = self.category_option.get()
 
-        if difficulty == "Pick a difficulty:" or category == "Pick a category:":
-            self.status_label.configure(text="please pick a category and difficulty !")
+        if difficulty == "pick a difficulty:" or category == "Pick a category:":
+            self.status_label.configure(text="please pick a category and difficulty !", text_color="red")
+        elif QUESTION_SOURCE == "bank":
+            questions_lst = sample_bank(self.convert_category(category), difficulty, self.first_batch_size(), self.owner)
+            if len(questions_lst) < 1:
+                self.status_label.configure(text="No questions in the local bank\n for this category yet!", text_color="red")
+            else:
+                self.open_game(questions_lst)
         else:
+            # A prefetched set starts the quiz immediately
+            prefetched = None
+            if QUESTION_SOURCE == "api":
+                prefetched = get_prefetcher().take((self.convert_category(category), difficulty, "multiple"))
+            if prefetched:
+                prefetched = filter_unseen(prefetched, self.owner)
+            if prefetched:
+                self.open_game(prefetched)
+                return
+
             print("making api request...")
-            questions_lst = self.load_questions(category, difficulty)
+            amount = self.first_batch_size()
+            self.set_loading(True)
+            self.fetch_task = BackgroundTask(
+                self, lambda: self.load_questions(category, difficulty, amount),
+                self.on_questions_loaded, self.on_questions_failed
+            ).start()
 
-            if len(questions_lst) < 1:
-                self.status_label.configure(text="Error in the process of making the request!\n please try again later...")
-            else:
-                self.quit()
-                self.destroy()
-                game = GameScreen(questions_lst, self.curUser)
-                game.mainloop()
-
-    def load_questions(self, category, difficulty) -> list:
-        category_id = self.convert_category(category)
-        amount = 10
-        q_type = "multiple"
-        base_url = f"https://opentdb.com/api.php?amount={amount}&category={category_id}&difficulty={difficulty}&type={q_type}"
-
-        try:
-            response = requests.get(base_url, timeout=5)
-            data = response.json()
-
-            if "response_code" in data:
-                code = data["response_code"]
-                if code == 1:
-                    raise ValueError("No Results: No questions found for the given parameters.")
-                elif code == 2:
-                    raise ValueError("Invalid Parameter: Check your query parameters.")
-                elif code == 3:
-                    raise ValueError("Token Not Found: Your session token is invalid.")
-                elif code == 4:
-                    raise ValueError("Token Empty: Your session token has expired, reset it.")
-
-            return data["results"]  # Return questions if everything is fine
-
-        except requests.exceptions.ConnectionError:
-            print("Error: Unable to connect to the API. Check your internet connection.")
-        except requests.exceptions.Timeout:
-            print("Error: The request timed out. Try again later.")
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP Error: {e}")
-        except ValueError as e:
-            print(f"API Error: {e}")
-        except KeyError:
-            print("Error: Unexpected response format from the API.")
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+    def cancel_loading(self):
+        """Stops waiting for the question request and re-enables the menu."""
+        if self.fetch_task is not None:
+            self.fetch_task.cancel()
+            self.fetch_task = None
+        self.set_loading(False)
+        self.status_label.configure(text="Request cancelled.", text_color="red")
+
+    def set_loading(self, loading):
+        """Switches the start button and status label between idle and loading."""
+        if loading:
+            self.status_label.configure(text="Loading questions...", text_color="gray")
+            self.start_button.configure(text="Cancel", command=self.cancel_loading)
+            self.category_option.configure(state="disabled")
+            self.difficulty_option.configure(state="disabled")
+            self.length_option.configure(state="disabled")
+        else:
+            self.start_button.configure(text="Start Quiz", command=self.start_game)
+            self.category_option.configure(state="readonly")
+            self.difficulty_option.configure(state="readonly")
+            self.length_option.configure(state="readonly")
+
+    def on_questions_loaded(self, questions_lst):
+        """Called on the Tk thread once the background request finished."""
+        self.fetch_task = None
+        self.set_loading(False)
+
+        if len(questions_lst) < 1:
+            self.status_label.configure(text="Error in the process of making the request!\n please try again later...", text_color="red")
+        else:
+            self.open_game(questions_lst)
+
+    def on_questions_failed(self, error):
+        """Called on the Tk thread if the background request raised, e.g. on a malformed response."""
+        self.fetch_task = None
+        self.set_loading(False)
+        print(f"Loading questions failed: {error!r}")
+        self.status_label.configure(text=f"Could not load questions:\n{error}", text_color="red")
+
+    def open_game(self, questions_lst):
+        """Switches to the game screen and starts the quiz, streaming the rest of its questions."""
+        if self.owner is not None:
+            get_history().mark_seen(self.owner, questions_lst)
+
+        category_id = self.convert_category(self.category_option.get())
+        difficulty = self.difficulty_option.get().lower()
+        stream = QuestionStream(questions_lst, make_supply(category_id, difficulty, self.owner),
+                                self.quiz_length())
+
+        self.app.show("game", questions=stream, curUser=self.curUser)
+
+    def load_questions(self, category, difficulty, amount) -> list:
+        """
+        Loads the quiz's first batch of questions from the cache, or from the
+        API on a cache miss. Runs on a worker thread, so it must not touch widgets.
+
+        Args:
+            category (str): The picked category name.
+            difficulty (str): "easy", "medium" or "hard".
+            amount (int): Number of questions to load.
+
+        Returns:
+            list: The questions, or an empty list if the request failed.
+        """
+        if QUESTION_SOURCE == "server":
+            return load_from_server(self.convert_category(category), difficulty, amount, self.owner)
+        return load_batch(self.convert_category(category), difficulty, amount, self.owner, use_prefetch=False)
+
+    def quiz_length(self) -> int:
+        """Returns the picked number of questions, or 0 for a marathon."""
+        name = self.length_option.get()
+        return 0 if name == "Marathon" else int(name.split()[0])
+
+    def first_batch_size(self) -> int:
+        """Returns how many questions to load before the quiz can start."""
+        length = self.quiz_length()
+        return min(length, STREAM_BATCH_SIZE) if length else STREAM_BATCH_SIZE
 
+    @staticmethod
+    def length_name(length) -> str:
+        return f"{length} questions" if length else "Marathon"
 
     def convert_category(self, category):
         return categories.index(category) + 9
 
 
 if __name__ == "__main__":
-    app = HomeScreen(None)
-    app.mainloop()
\ No newline at end of file
+    run("home", user=None)
\ No newline at end of file
@@ -4,13 +4,86 @@ leaderboard.py
 This module defines the LeaderboardScreen class for displaying
 the top players ranked by points in a Quiz Game.
 
+The list is virtualized: only enough row widgets to fill the viewport are
+created, and scrolling rebinds them to other users instead of creating
+widgets per user, so memory and redraw time don't grow with the user base.
+
+While the screen is shown it follows the users database live (see
+storeWatcher.py). On each change only the visible slice is re-read, and
+only the rows whose rank, user or points differ from what they show are
+redrawn, so a leaderboard left open costs next to nothing between scores.
+
+The store is queried on a worker thread (see worker.py), since with the
+"remote" backend every query waits for the quiz server. One query runs at
+a time; scrolls and changes that arrive meanwhile are folded into a
+single follow-up query.
+
 """
 
+import math
 import customtkinter as ctk
-import json
+from metrics import get_metrics
+from screenManager import Screen, run
+from storeWatcher import StoreWatcher
+from userStore import get_store
+from worker import BackgroundTask
+
+# Height in pixels reserved for one leaderboard row, including padding
+ROW_HEIGHT = 34
 
+# Rows scrolled by one mouse wheel step
+WHEEL_ROWS = 3
 
-class LeaderboardScreen(ctk.CTk):
+
+class LeaderboardRow(ctk.CTkFrame):
+    """
+    LeaderboardRow is a reusable row showing one user's rank, name and points.
+    """
+
+    def __init__(self, master):
+        super().__init__(master, height=ROW_HEIGHT - 4)
+
+        self.default_color = self.cget("fg_color")
+        self.shown = (None, None, None, False)
+
+        # Rank
+        self.rank_label = ctk.CTkLabel(self, text="", width=50)
+        self.rank_label.pack(side="left", padx=(10, 0))
+
+        # Username
+        self.username_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.username_label.pack(side="left", padx=(20, 0), expand=True, fill="x")
+
+        # Points
+        self.points_label = ctk.CTkLabel(self, text="", width=80)
+        self.points_label.pack(side="right", padx=(0, 10))
+
+    def show(self, rank, user, highlight):
+        """
+        Binds the row to a user, reconfiguring only the labels that changed.
+
+        Args:
+            rank (int): The user's 1-based rank.
+            user (dict): The user's record.
+            highlight (bool): Whether this is the current user's row.
+        """
+        if self.shown == (rank, user["username"], user["points"], highlight):
+            return
+        old_rank, old_username, old_points, old_highlight = self.shown
+
+        if rank != old_rank:
+            self.rank_label.configure(text=f"#{rank}")
+        if user["username"] != old_username:
+            self.username_label.configure(text=user["username"])
+        if user["points"] != old_points:
+            self.points_label.configure(text=str(user["points"]))
+        if highlight != old_highlight:
+            self.configure(fg_color=("lightblue", "#2a5278") if highlight else self.default_color)
+
+        self.shown = (rank, user["username"], user["points"], highlight)
+
+
+class LeaderboardScreen(Screen):
     """
     LeaderboardScreen class displays a ranked list of users based on their points.
 
@@ -18,26 +91,53 @@ class LeaderboardScreen(ctk.CTk):
         current_user (dict): The currently logged-in user (optional).
     """
 
-    def __init__(self, current_user=None):
+    window_title = "Leaderboard"
+
+    def __init__(self, app):
         """
-        Initializes the leaderboard window and loads user rankings.
+        Builds the leaderboard screen. The rankings are loaded each time it is shown.
 
         Args:
-            current_user (dict, optional): The current user's details. Defaults to None.
+            app (App): The root window showing the screen.
         """
 
-        super().__init__()
-
-        self.current_user = current_user
+        super().__init__(app)
 
-        # Configure window
-        self.title("Leaderboard")
-        self.geometry("400x500")
-        self.resizable(False, False)
+        self.current_user = None
+        self.first_row = 0
+        self.total_rows = 0
+        self.row_pool = []
+        self.watcher = None
+        self.load_task = None
+        self.reload_pending = False
 
         self.init_GUI()
+
+    def on_show(self, current_user=None):
+        """
+        Scrolls back to the top and loads the current rankings.
+
+        Args:
+            current_user (dict, optional): The current user's details. Defaults to None.
+        """
+
+        self.current_user = current_user
+        self.first_row = 0
+        self.set_subtitle("Top players by points")
         self.load_leaderboard_data()
 
+        self.watcher = StoreWatcher(self, get_store().files(), self.load_leaderboard_data).start()
+
+    def on_hide(self):
+        """Stops following the users database."""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.load_task is not None:
+            self.load_task.cancel()
+            self.load_task = None
+        self.reload_pending = False
+
     def init_GUI(self):
         # Create main frame
         self.main_frame = ctk.CTkFrame(self)
@@ -98,18 +198,27 @@ class LeaderboardScreen(ctk.CTk):
         )
         self.points_header.pack(side="right", padx=(0, 10))
 
-        # Create a container frame for the scrollable frame
+        # Create a container frame for the rows and their scrollbar
         self.container = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         self.container.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
-        # Create scrollable frame
-        self.scrollable_frame = ctk.CTkScrollableFrame(
+        self.scrollbar = ctk.CTkScrollbar(self.container, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Create the viewport holding the recycled row widgets
+        self.rows_frame = ctk.CTkFrame(
             self.container,
             width=340,
             height=300,
             fg_color="transparent"
         )
-        self.scrollable_frame.pack(fill="both", expand=True)
+        self.rows_frame.pack(side="left", fill="both", expand=True)
+        self.rows_frame.pack_propagate(False)
+        self.rows_frame.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.rows_frame)
+
+        # Label used for errors and the empty leaderboard
+        self.message_label = ctk.CTkLabel(self.rows_frame, text="", text_color="red")
 
         # Create refresh button at the bottom
         self.refresh_button = ctk.CTkButton(
@@ -121,79 +230,153 @@ class LeaderboardScreen(ctk.CTk):
         self.refresh_button.pack(pady=(5, 10))
 
     def load_leaderboard_data(self):
-        """Loads and displays the leaderboard rankings from a JSON file."""
-
-        # Clear existing items in the scrollable frame
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        try:
-            with open("users.json", "r") as file:
-                json_data = json.load(file)
-
-            # Sort users by points (highest first)
-            sorted_users = sorted(json_data["data"], key=lambda x: x["points"], reverse=True)
-
-            # Add each user to the leaderboard
-            for i, user in enumerate(sorted_users):
-                # Create a frame for each row
-                row_frame = ctk.CTkFrame(self.scrollable_frame)
-                row_frame.pack(fill="x", pady=2)
-
-                # Highlight current user's row
-                if self.current_user and user["username"] == self.current_user["username"]:
-                    row_frame.configure(fg_color=("lightblue", "#2a5278"))
-
-                # Rank
-                rank_label = ctk.CTkLabel(
-                    row_frame,
-                    text=f"#{i + 1}",
-                    width=50
-                )
-                rank_label.pack(side="left", padx=(10, 0))
-
-                # Username
-                username_label = ctk.CTkLabel(
-                    row_frame,
-                    text=user["username"],
-                    anchor="w"
-                )
-                username_label.pack(side="left", padx=(20, 0), expand=True, fill="x")
-
-                # Points
-                points_label = ctk.CTkLabel(
-                    row_frame,
-                    text=str(user["points"]),
-                    width=80
-                )
-                points_label.pack(side="right", padx=(0, 10))
-
-        except FileNotFoundError:
-            error_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="Error: Users database not found!",
-                text_color="red"
-            )
-            error_label.pack(pady=20)
-
-        except Exception as e:
-            error_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=f"Error loading leaderboard: {str(e)}",
-                text_color="red"
-            )
-            error_label.pack(pady=20)
+        """Loads the rankings at the current scroll position on a worker thread, then updates the rows in place."""
+
+        if self.load_task is not None and self.load_task.running():
+            self.reload_pending = True
+            return
+
+        username = self.current_user["username"] if self.current_user else None
+        self.load_task = BackgroundTask(
+            self, lambda: query_leaderboard(self.first_row, len(self.row_pool), username),
+            self.on_leaderboard_loaded, self.on_leaderboard_failed
+        ).start()
+
+    def on_leaderboard_loaded(self, result):
+        """Shows the rankings read by load_leaderboard_data."""
+
+        self.total_rows, rank, first_row, users = result
+        if rank is not None:
+            self.set_subtitle(f"Top players by points - you are #{rank}")
+
+        if self.reload_pending:
+            # The view moved or the scores changed while this was loading
+            self.reload_pending = False
+            self.load_leaderboard_data()
+        else:
+            self.first_row = first_row
+        self.render_rows(first_row, users)
+
+    def on_leaderboard_failed(self, error):
+        if isinstance(error, FileNotFoundError):
+            self.show_error("Error: Users database not found!")
+        else:
+            self.show_error(f"Error loading leaderboard: {str(error)}")
+
+        if self.reload_pending:
+            self.reload_pending = False
+            self.load_leaderboard_data()
+
+    def render_rows(self, first_row, users):
+        """Binds the row widgets to a slice of the leaderboard starting at first_row."""
+
+        visible = len(self.row_pool)
+        self.message_label.place_forget()
+        current_username = self.current_user["username"] if self.current_user else None
+
+        for i, row in enumerate(self.row_pool):
+            if i < len(users):
+                row.show(first_row + i + 1, users[i], users[i]["username"] == current_username)
+                if not row.winfo_ismapped():
+                    row.place(x=0, y=i * ROW_HEIGHT, relwidth=1)
+            else:
+                row.place_forget()
+
+        if self.total_rows:
+            self.scrollbar.set(first_row / self.total_rows,
+                               min(first_row + visible, self.total_rows) / self.total_rows)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def set_subtitle(self, text):
+        """Changes the subtitle, skipping the redraw if it already reads the same."""
+
+        if self.subtitle.cget("text") != text:
+            self.subtitle.configure(text=text)
+
+    def show_error(self, message):
+        """Hides the rows and shows an error message in their place."""
+
+        for row in self.row_pool:
+            row.place_forget()
+        self.message_label.configure(text=message)
+        self.message_label.place(relx=0.5, y=20, anchor="n")
+
+    def on_resize(self, event):
+        """Grows the row pool so the rows fill the viewport."""
+
+        needed = math.ceil(event.height / ROW_HEIGHT)
+        if needed <= len(self.row_pool):
+            return
+
+        for _ in range(needed - len(self.row_pool)):
+            row = LeaderboardRow(self.rows_frame)
+            self.bind_wheel(row)
+            for label in (row.rank_label, row.username_label, row.points_label):
+                self.bind_wheel(label)
+            self.row_pool.append(row)
+
+        self.load_leaderboard_data()
+
+    def bind_wheel(self, widget):
+        """Scrolls the leaderboard when the mouse wheel is used over a widget."""
+
+        widget.bind("<MouseWheel>", self.on_mouse_wheel)
+        widget.bind("<Button-4>", lambda event: self.scroll_by(-WHEEL_ROWS))
+        widget.bind("<Button-5>", lambda event: self.scroll_by(WHEEL_ROWS))
+
+    def on_mouse_wheel(self, event):
+        self.scroll_by(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
+
+    def on_scrollbar(self, action, value, unit=None):
+        """Handles the scrollbar's "moveto" and "scroll" commands."""
+
+        if action == "moveto":
+            self.first_row = int(float(value) * self.total_rows)
+            self.load_leaderboard_data()
+        elif action == "scroll":
+            steps = int(value)
+            if unit == "pages":
+                steps *= len(self.row_pool)
+            self.scroll_by(steps)
+
+    def scroll_by(self, rows):
+        """Moves the viewport by a number of rows."""
+
+        self.first_row = max(0, min(self.first_row + rows, self.total_rows - len(self.row_pool)))
+        self.load_leaderboard_data()
 
     def go_back(self):
         """Returns to the home screen."""
 
-        from homeScreen import HomeScreen
-        self.destroy()
-        app = HomeScreen(self.current_user)
-        app.mainloop()
+        self.app.show("home", user=self.current_user)
+
+
+def query_leaderboard(first_row, visible, username):
+    """
+    Reads what the leaderboard shows. Runs on a worker thread.
+
+    Args:
+        first_row (int): 0-based position of the first row wanted.
+        visible (int): The number of rows shown.
+        username (str): The current user, or None.
+
+    Returns:
+        tuple: (number of users, the user's rank or None, the first row
+        clamped to the users there are, the user records to show).
+    """
+    metrics = get_metrics()
+    with metrics.timer("leaderboard.load"):
+        store = get_store()
+        total_rows = store.count()
+        rank = store.rank(username) if username else None
+
+        first_row = max(0, min(first_row, total_rows - visible))
+        with metrics.timer("leaderboard.query"):
+            users = store.ranked(first_row, first_row + visible)
+    return total_rows, rank, first_row, users
 
 
 if __name__ == "__main__":
     # For testing purposes
-    app = LeaderboardScreen()
-    app.mainloop()
+    run("leaderboard")
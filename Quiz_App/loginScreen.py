@@ -11,10 +11,13 @@ to the signup screen.
 
 import customtkinter as ctk
 import json
-from homeScreen import HomeScreen
+from tkinter import messagebox
+from screenManager import Screen, run
+from userStore import get_store
+from worker import BackgroundTask
 
 
-class LoginApp(ctk.CTk):
+class LoginApp(Screen):
     """
         LoginApp class provides a GUI login screen.
 
@@ -22,16 +25,25 @@ class LoginApp(ctk.CTk):
         If successful, they are redirected to the home screen.
     """
 
-    def __init__(self):
-        super().__init__()
+    window_title = "Login Screen"
 
-        # Configure window
-        self.title("Login Screen")
-        self.geometry("400x500")
-        self.resizable(False, False)
+    def __init__(self, app):
+        super().__init__(app)
 
+        self.login_task = None
         self.init_GUI()
 
+    def on_show(self):
+        """Clears the password left over from the last login."""
+        self.password_entry.delete(0, "end")
+
+    def on_hide(self):
+        """Stops waiting for a password check that is still running."""
+        if self.login_task is not None:
+            self.login_task.cancel()
+            self.login_task = None
+            self.login_button.configure(state="normal", text="Login")
+
 
     def init_GUI(self):
         """Initializes and arranges GUI components."""
@@ -106,67 +118,79 @@ class LoginApp(ctk.CTk):
 
 
     def login(self):
-        """Validates user credentials and logs in the user."""
+        """Validates user credentials on a worker thread and logs in the user."""
+
+        if self.login_task is not None and self.login_task.running():
+            return
 
         username = self.username_entry.get()
         password = self.password_entry.get()
 
-        users = self.read_json()
-
         if not username or not password:
             self.show_message("Please enter both username and password")
         else:
-            user = self.search_by_username(users, username, password)
-            if user == -1:
-                print("error! user not found...")
-            else:
-                print(user)
-                self.quit()
-                self.destroy()
-                home_screen = HomeScreen(user)
-                home_screen.mainloop()
+            # Checking a password hash takes a noticeable moment, so it runs off the Tk thread
+            self.login_button.configure(state="disabled", text="Logging in...")
+            self.login_task = BackgroundTask(
+                self, lambda: self.search_by_username(username, password),
+                self.on_login_checked, self.on_login_failed
+            ).start()
+
+    def on_login_checked(self, user):
+        """Opens the home screen once the credentials were found to match."""
+        self.login_task = None
+        self.login_button.configure(state="normal", text="Login")
+
+        if user == -1:
+            print("error! user not found...")
+        else:
+            print(user)
+            self.app.show("home", user=user)
+
+    def on_login_failed(self, error):
+        """Called on the Tk thread if checking the credentials raised, e.g. on a malformed record."""
+        self.login_task = None
+        self.login_button.configure(state="normal", text="Login")
+
+        print(f"Login failed: {error!r}")
+        messagebox.showerror("Error", f"Could not log in: {error}")
 
     def register_click(self, event):
         """Handles the transition to the registration screen."""
 
-        from signUpScreen import SignupApp
-
-        self.destroy()
-        app = SignupApp()
-        app.mainloop()
-        self.show_message("Registration functionality")
+        self.app.show("signup")
 
     def show_message(self, message):
         # Display message (in a real app, you might use a proper message box)
         print(message)
 
-    def read_json(self):
+    def search_by_username(self, username, password):
         """
-        Reads the user database from a JSON file.
+        Looks up a user in the shared user store and checks the password.
+        Runs on a worker thread.
+
+        Args:
+            username (str): The username to look up.
+            password (str): The password entered by the user.
 
         Returns:
-            list: List of user dictionaries or None if the file is not found.
+            dict: The user's record, or -1 if the credentials don't match.
         """
 
         try:
-            with open("users.json", "r") as file:
-                json_data = json.load(file)
-            return json_data.get("data", [])
+            user = get_store().authenticate(username, password)
         except FileNotFoundError:
-            return None
+            return -1
         except json.JSONDecodeError:
             self.show_message("Error reading user data!")
-            return None
-
-    def search_by_username(self, usersList, username, password):
-        for user in usersList:
-            if user["username"] == username and user["password"] == password:
-                return user
+            return -1
+        except OSError as e:
+            self.show_message(f"Could not reach the user database: {e}")
+            return -1
 
-        return -1
+        return user if user is not None else -1
 
 
 if __name__ == "__main__":
-    app = LoginApp()
-    app.mainloop()
+    run("login")
 
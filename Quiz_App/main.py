@@ -22,8 +22,7 @@ JSON FILE CONTENT
 
 """
 
-from loginScreen import LoginApp
+from screenManager import run
 
 if __name__ == "__main__":
-    app = LoginApp()
-    app.mainloop()
+    run("login")
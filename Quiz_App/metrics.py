@@ -0,0 +1,233 @@
+"""
+metrics.py
+----------------------
+This module defines the Metrics class, a small registry of counters and
+timing histograms used to see where the Quiz Game spends its time.
+
+The hot paths (API requests, question loading, user store reads and
+writes, leaderboard loading and screen construction) are wrapped in
+timers. When METRICS_ENABLED in config.py is False, a timer is a shared
+object that does nothing and count() returns right away, so the
+instrumentation costs one attribute check per call.
+
+Metrics can be exported to METRICS_FILE as JSON lines (one snapshot per
+line) or as Prometheus text, and shown live in a debug overlay window
+(press F12 while the app runs with metrics enabled).
+
+"""
+
+import bisect
+import json
+import threading
+import time
+from config import METRICS_ENABLED, METRICS_FILE, METRICS_FORMAT
+from fileLock import atomic_write
+
+# Upper bounds in seconds of the histogram buckets: Prometheus' defaults,
+# plus finer ones for the sub-millisecond in-memory paths
+BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Histogram counts observed durations in fixed buckets.
+
+    Attributes:
+        count (int): Number of observations.
+        total (float): Sum of the observations, in seconds.
+        buckets (list): Observations per bucket; the last one is unbounded.
+    """
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q) -> float:
+        """Estimates a quantile, interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, in_bucket in enumerate(self.buckets):
+            if in_bucket and seen + in_bucket >= rank:
+                low = BUCKETS[i - 1] if i > 0 else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return low + (high - low) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return BUCKETS[-1]
+
+
+class _Timer:
+    """Times a with block and records it in a histogram."""
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    """Stands in for a timer while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Metrics collects counters and timing histograms from every thread.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        """
+        Initializes an empty registry.
+
+        Args:
+            enabled (bool): Whether anything is recorded. Defaults to METRICS_ENABLED from config.py.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def timer(self, name):
+        """
+        Returns a context manager that records how long its block took.
+
+        Args:
+            name (str): The histogram to record in, e.g. "store.write".
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def count(self, name, amount=1):
+        """Adds to a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Records a duration in a histogram."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current values.
+
+        Returns:
+            dict: "counters" maps names to counts. "histograms" maps names to
+            their count, sum, p50, p99 and per-bucket counts.
+        """
+        with self._lock:
+            return {
+                "time": time.time(),
+                "counters": dict(self._counters),
+                "histograms": {
+                    name: {
+                        "count": h.count,
+                        "sum": h.total,
+                        "p50": h.quantile(0.5),
+                        "p99": h.quantile(0.99),
+                        "buckets": list(h.buckets),
+                    }
+                    for name, h in self._histograms.items()
+                },
+            }
+
+    def export(self, path=METRICS_FILE, fmt=METRICS_FORMAT):
+        """
+        Writes the current values to a file.
+
+        Args:
+            path (str): The file to write. Defaults to METRICS_FILE from config.py.
+            fmt (str): "jsonl" appends a snapshot line, "prometheus" replaces
+                the file with Prometheus text. Defaults to METRICS_FORMAT.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        snapshot = self.snapshot()
+        if fmt == "jsonl":
+            with open(path, "a") as file:
+                file.write(json.dumps(snapshot, separators=(",", ":")) + "\n")
+        elif fmt == "prometheus":
+            atomic_write(path, to_prometheus(snapshot))
+        else:
+            raise ValueError(f"Unknown metrics format: {fmt}")
+
+
+def to_prometheus(snapshot) -> str:
+    """Formats a snapshot as Prometheus text exposition."""
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = "quiz_" + _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    for name, h in sorted(snapshot["histograms"].items()):
+        metric = "quiz_" + _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, in_bucket in zip(BUCKETS + ("+Inf",), h["buckets"]):
+            cumulative += in_bucket
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h['sum']}")
+        lines.append(f"{metric}_count {h['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _metric_name(name) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Returns the metrics registry shared by the whole process, creating it on first use."""
+    global _metrics
+    # Called on every timed operation, so skip the lock once the registry exists
+    if _metrics is not None:
+        return _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
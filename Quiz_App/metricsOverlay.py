@@ -0,0 +1,71 @@
+"""
+metricsOverlay.py
+----------------------
+This module defines the MetricsOverlay class, a debug window showing the
+live metrics collected by metrics.py. It is opened and closed with F12
+when METRICS_ENABLED is set in config.py.
+
+"""
+
+import customtkinter as ctk
+from metrics import get_metrics
+
+# How often (in milliseconds) the overlay redraws the metrics
+REFRESH_INTERVAL_MS = 1000
+
+
+class MetricsOverlay(ctk.CTkToplevel):
+    """
+    MetricsOverlay lists every counter and timer with its count, p50, p99 and mean.
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+
+        self.title("Metrics")
+        self.geometry("520x400")
+        self.attributes("-topmost", True)
+
+        self.text = ctk.CTkTextbox(self, font=("Courier", 12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        self.export_button = ctk.CTkButton(self, text="Export", width=120, command=self.export)
+        self.export_button.pack(pady=(0, 10))
+
+        self.refresh_job = None
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the metrics and schedules the next redraw."""
+        snapshot = get_metrics().snapshot()
+
+        lines = [f"{'timer':28} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}"]
+        for name, h in sorted(snapshot["histograms"].items()):
+            mean = h["sum"] / h["count"] if h["count"] else 0.0
+            lines.append(f"{name:28} {h['count']:7} {h['p50'] * 1000:9.1f} {h['p99'] * 1000:9.1f} {mean * 1000:9.1f}")
+
+        lines.append("")
+        lines.append(f"{'counter':28} {'value':>7}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:28} {value:7}")
+
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state="disabled")
+
+        self.refresh_job = self.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def export(self):
+        """Writes the current metrics to the metrics file."""
+        try:
+            get_metrics().export()
+        except OSError as e:
+            print(f"Could not export metrics: {e}")
+
+    def destroy(self):
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        super().destroy()
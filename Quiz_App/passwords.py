@@ -0,0 +1,142 @@
+"""
+passwords.py
+----------------------
+This module hashes and checks user passwords with scrypt, a salted,
+memory-hard key derivation function.
+
+A stored password looks like "scrypt$<n>$<r>$<p>$<salt>$<hash>", so the
+cost it was hashed with travels with it and can be raised in config.py
+without breaking existing accounts. Records from before hashing was added
+still hold the plaintext password; they are checked as before and
+rehashed by UserStore.authenticate on the user's next successful login.
+
+A hash costs tens to hundreds of milliseconds on purpose, so the screens
+never call these functions on the Tk thread (see worker.py). hashlib
+releases the GIL while it derives the key, so a worker thread is enough
+to keep the window responsive.
+
+Running this module benchmarks the scrypt cost settings on this machine:
+
+    python passwords.py [--target-ms 250] [--repeat 3]
+
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+from config import SCRYPT_N, SCRYPT_R, SCRYPT_P
+
+SCHEME = "scrypt"
+
+# Bytes of random salt and of derived key
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+
+def _derive(password, salt, n, r, p) -> bytes:
+    # scrypt needs 128 * n * r bytes; leave headroom over OpenSSL's 32 MB default
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + (1 << 20), dklen=KEY_SIZE)
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P) -> str:
+    """
+    Hashes a password with a fresh random salt.
+
+    Args:
+        password (str): The password to hash.
+        n (int): scrypt CPU/memory cost, a power of 2. Defaults to SCRYPT_N from config.py.
+        r (int): scrypt block size. Defaults to SCRYPT_R.
+        p (int): scrypt parallelism. Defaults to SCRYPT_P.
+
+    Returns:
+        str: The hash to store, including its salt and cost.
+    """
+    salt = os.urandom(SALT_SIZE)
+    key = _derive(password, salt, n, r, p)
+    return "$".join([SCHEME, str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(key).decode()])
+
+
+def _parse(stored):
+    """Splits a stored hash into (n, r, p, salt, key), or returns None for a plaintext password."""
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        return n, r, p, base64.b64decode(parts[4], validate=True), base64.b64decode(parts[5], validate=True)
+    except ValueError:
+        return None
+
+
+def verify_password(password, stored) -> bool:
+    """
+    Checks a password against a stored hash or legacy plaintext password.
+
+    Args:
+        password (str): The password entered.
+        stored (str): The password stored in the user's record.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+
+    n, r, p, salt, key = parsed
+    return hmac.compare_digest(_derive(password, salt, n, r, p), key)
+
+
+def needs_rehash(stored) -> bool:
+    """Returns True if a stored password is plaintext or was hashed with other cost settings."""
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def benchmark(costs, repeat) -> list:
+    """
+    Times hashing a password at several scrypt costs.
+
+    Args:
+        costs (list): The n values to time.
+        repeat (int): Hashes per cost; the fastest one is reported.
+
+    Returns:
+        list: (n, milliseconds, megabytes of memory) tuples.
+    """
+    results = []
+    for n in costs:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hash_password("benchmark password", n=n)
+            best = min(best, time.perf_counter() - start)
+        results.append((n, best * 1000, 128 * n * SCRYPT_R / (1 << 20)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time scrypt password hashing at several costs.")
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="longest acceptable time to check a password")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"r={SCRYPT_R} p={SCRYPT_P}")
+    print(f"{'n':>8} {'ms':>9} {'MB':>6}")
+    best = None
+    for n, ms, mb in benchmark([2 ** k for k in range(12, 19)], args.repeat):
+        marker = " <- configured" if n == SCRYPT_N else ""
+        print(f"{n:8} {ms:9.1f} {mb:6.0f}{marker}")
+        if ms <= args.target_ms:
+            best = n
+
+    if best is None:
+        print(f"Even the cheapest cost takes longer than {args.target_ms:.0f} ms here.")
+    else:
+        print(f"Highest cost within {args.target_ms:.0f} ms: SCRYPT_N = {best}")
@@ -0,0 +1,124 @@
+"""
+prefetch.py
+----------------------
+This module defines the Prefetcher class, which keeps ready-to-play
+question sets for recently used and popular (category, difficulty, type)
+keys, so starting a quiz doesn't wait for the API.
+
+A single background thread refills the buffers one request at a time, so
+prefetching never floods the API. Every set it downloads is also stored in
+the question cache.
+
+"""
+
+import queue
+import threading
+from collections import Counter, deque
+from config import PREFETCH_DEPTH
+from questionCache import QuestionCache, get_cache
+
+
+class Prefetcher:
+    """
+    Prefetcher buffers question sets per key and refills them in the background.
+
+    Keys are (category_id, difficulty, q_type) tuples.
+
+    Attributes:
+        fetch (callable): Downloads a question set for a key. Called on the
+            background thread.
+        depth (int): Number of ready sets kept per key.
+        owner (str): The user sets are fetched for, so the API session token
+            and seen-question filter of that user are used. None until a
+            user logs in.
+    """
+
+    def __init__(self, fetch, depth=PREFETCH_DEPTH):
+        """
+        Initializes empty buffers and starts the background thread.
+
+        Args:
+            fetch (callable): Takes a key and an owner and returns a list of decoded questions.
+            depth (int): Number of ready sets kept per key.
+        """
+        self.fetch = fetch
+        self.depth = depth
+        self.owner = None
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._uses = Counter()
+        self._wanted = queue.Queue()
+        self._queued = set()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def take(self, key):
+        """
+        Hands out a ready question set, if one is buffered, and schedules a refill.
+
+        Args:
+            key (tuple): The (category_id, difficulty, q_type) key.
+
+        Returns:
+            list: The questions, or None if nothing is buffered for the key yet.
+        """
+        with self._lock:
+            self._uses[key] += 1
+            buffer = self._buffers.get(key)
+            questions = buffer.popleft() if buffer else None
+
+        self.prefetch(key)
+        return questions
+
+    def prefetch(self, key):
+        """Asks the background thread to fill the key's buffer."""
+        with self._lock:
+            if key in self._queued or len(self._buffers.get(key, ())) >= self.depth:
+                return
+            self._queued.add(key)
+        self._wanted.put(key)
+
+    def popular(self, n) -> list:
+        """Returns the n keys taken most often in this session."""
+        with self._lock:
+            return [key for key, _ in self._uses.most_common(n)]
+
+    def _run(self):
+        while True:
+            key = self._wanted.get()
+            try:
+                questions = self.fetch(key, self.owner)
+            except Exception as e:
+                print(f"Prefetch failed for {key}: {e}")
+                questions = None
+
+            with self._lock:
+                self._queued.discard(key)
+                if questions:
+                    self._buffers.setdefault(key, deque()).append(questions)
+                    # Keep going until the buffer is full
+                    if len(self._buffers[key]) < self.depth:
+                        self._queued.add(key)
+                        self._wanted.put(key)
+
+
+def fetch_and_cache(key, owner) -> list:
+    """Downloads a fresh question set for a key and stores it in the question cache."""
+    from triviaApi import fetch_questions
+
+    category_id, difficulty, q_type = key
+    questions = fetch_questions(category_id, difficulty, q_type=q_type, owner=owner, background=True)
+    get_cache().put(QuestionCache.make_key(category_id, difficulty, q_type), questions)
+    return questions
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Returns the prefetcher shared by the whole process, creating it on first use."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(fetch_and_cache)
+        return _prefetcher
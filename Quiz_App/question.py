@@ -0,0 +1,76 @@
+"""
+question.py
+----------------------
+This module defines the Question record used everywhere questions are
+passed around in the Quiz Game.
+
+A Question is decoded from the API's HTML-escaped form exactly once, when
+it arrives, and keeps its answers ready for display. It uses __slots__,
+so it is much smaller than the API's dictionary and the game screen can
+show it without any parsing or string-key lookups.
+
+"""
+
+import html
+
+
+class Question:
+    """
+    Question is a compact, already-decoded quiz question.
+
+    Attributes:
+        text (str): The question text.
+        answers (tuple): Every answer, the correct one first.
+        difficulty (str): "easy", "medium" or "hard".
+        q_type (str): "multiple" or "boolean".
+        category_id (int): The API's category id, or None if unknown.
+    """
+
+    __slots__ = ("text", "answers", "difficulty", "q_type", "category_id")
+
+    def __init__(self, text, answers, difficulty=None, q_type=None, category_id=None):
+        self.text = text
+        self.answers = answers
+        self.difficulty = difficulty
+        self.q_type = q_type
+        self.category_id = category_id
+
+    @property
+    def correct_answer(self) -> str:
+        return self.answers[0]
+
+    @property
+    def incorrect_answers(self) -> tuple:
+        return self.answers[1:]
+
+    @classmethod
+    def from_api(cls, raw, category_id=None):
+        """
+        Builds a Question from the API's dictionary, decoding its HTML entities.
+
+        Args:
+            raw (dict): A question as returned by the Open Trivia Database.
+            category_id (int, optional): The API's category id. Defaults to None.
+        """
+        answers = (html.unescape(raw["correct_answer"]),) + tuple(html.unescape(ans) for ans in raw["incorrect_answers"])
+        return cls(html.unescape(raw["question"]), answers, raw.get("difficulty"), raw.get("type"), category_id)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a Question from a dictionary saved with to_dict."""
+        answers = (data["correct_answer"],) + tuple(data["incorrect_answers"])
+        return cls(data["question"], answers, data.get("difficulty"), data.get("type"), data.get("category_id"))
+
+    def to_dict(self) -> dict:
+        """Returns the question as an already-decoded, JSON-friendly dictionary."""
+        return {
+            "question": self.text,
+            "correct_answer": self.correct_answer,
+            "incorrect_answers": list(self.incorrect_answers),
+            "difficulty": self.difficulty,
+            "type": self.q_type,
+            "category_id": self.category_id,
+        }
+
+    def __repr__(self):
+        return f"Question({self.text!r})"
@@ -0,0 +1,279 @@
+"""
+questionBank.py
+----------------------
+This module defines the QuestionBank class, a local file of decoded
+questions that quizzes can be served from without the API.
+
+The bank is a JSON-lines file with one question per line. A sidecar
+index maps each (category id, difficulty, type) key to the byte offsets of
+its questions, so a question is read with a single seek and the whole
+bank never has to be loaded. Sampling swaps a random offset with the
+last one and pops it, which draws without replacement in O(1).
+
+Questions are imported in bulk, either straight from the API (every
+question of a category, page by page, using a session token) or from a
+JSON-lines file of API questions. Both importers stream their records to
+disk instead of holding them in memory.
+
+Usage:
+    python questionBank.py import 9 10 11     (import categories from the API)
+    python questionBank.py import all
+    python questionBank.py import-file questions.jsonl 9
+    python questionBank.py stats
+
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+from config import QUESTION_BANK_FILE
+from fileLock import atomic_write
+from question import Question
+from questionCache import QuestionCache
+from questionHistory import question_hash
+
+# Largest page the API serves in one request
+IMPORT_PAGE_SIZE = 50
+
+
+class QuestionBank:
+    """
+    QuestionBank serves random questions from a local JSON-lines file.
+
+    Attributes:
+        path (str): Path to the bank file.
+        index_path (str): Path to the sidecar offset index.
+    """
+
+    def __init__(self, path=QUESTION_BANK_FILE):
+        """
+        Initializes the bank. The index is loaded, or rebuilt, on first use.
+
+        Args:
+            path (str): Path to the bank file.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._index = None
+        self._pools = {}
+
+    def count(self, category_id, difficulty, q_type) -> int:
+        """Returns how many questions the bank holds for a key."""
+        key = QuestionCache.make_key(category_id, difficulty, q_type)
+        with self._lock:
+            return len(self._load_index().get(key, ()))
+
+    def sample(self, category_id, difficulty, q_type, amount, skip=None) -> list:
+        """
+        Draws random questions without replacement.
+
+        Each key has a pool of not-yet-drawn questions. When a pool runs out
+        it is refilled with every question of the key, so questions only
+        repeat after the whole key was served.
+
+        Args:
+            category_id (int): The API's category id.
+            difficulty (str): "easy", "medium" or "hard".
+            q_type (str): "multiple" or "boolean".
+            amount (int): Number of questions wanted.
+            skip (callable, optional): Questions for which it returns True
+                are drawn but not returned. Defaults to None.
+
+        Returns:
+            list: Up to amount Question records.
+        """
+        key = QuestionCache.make_key(category_id, difficulty, q_type)
+        questions = []
+
+        with self._lock:
+            offsets = self._load_index().get(key, [])
+            if not offsets:
+                return questions
+
+            pool = self._pools.get(key)
+            if not pool:
+                pool = self._pools[key] = list(offsets)
+
+            with open(self.path, "rb") as file:
+                while pool and len(questions) < amount:
+                    i = random.randrange(len(pool))
+                    pool[i], pool[-1] = pool[-1], pool[i]
+                    file.seek(pool.pop())
+                    question = Question.from_dict(json.loads(file.readline()))
+                    if skip is None or not skip(question):
+                        questions.append(question)
+
+        return questions
+
+    def import_from_api(self, category_ids, client=None) -> int:
+        """
+        Imports every question of some categories from the API.
+
+        A fresh session token is used so each page only brings new
+        questions. Pages are written to the bank as they arrive.
+
+        Args:
+            category_ids (list): The API's category ids.
+            client (TriviaClient, optional): The client to use. Defaults to the shared client.
+
+        Returns:
+            int: The number of questions added.
+        """
+        from triviaApi import get_client
+
+        client = client or get_client()
+        added = 0
+        with self._lock, _BankWriter(self) as writer:
+            for category_id in category_ids:
+                token = client.request_token()
+                amount = IMPORT_PAGE_SIZE
+                while amount > 0:
+                    params = {"amount": amount, "category": category_id, "token": token}
+                    data = client.get_json("api.php", params, background=True)
+                    code = data.get("response_code")
+                    if code == 0:
+                        for raw in data["results"]:
+                            added += writer.add(category_id, raw)
+                    elif code == 1:
+                        # Fewer questions left than asked for
+                        amount //= 2
+                    else:
+                        # 4 means the token has seen every question of the category
+                        break
+                print(f"Category {category_id}: {added} questions imported so far")
+        return added
+
+    def import_from_file(self, path, category_id) -> int:
+        """
+        Imports questions from a JSON-lines file of API questions, one per line.
+
+        Args:
+            path (str): The file to import.
+            category_id (int): The category id to file the questions under.
+
+        Returns:
+            int: The number of questions added.
+        """
+        added = 0
+        with self._lock, _BankWriter(self) as writer, open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    added += writer.add(category_id, json.loads(line))
+        return added
+
+    def _load_index(self) -> dict:
+        """Returns the offset index, loading or rebuilding the sidecar as needed. Needs the lock."""
+        if self._index is not None:
+            return self._index
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        try:
+            with open(self.index_path, "r") as file:
+                saved = json.load(file)
+            if saved["size"] == size:
+                self._index = saved["keys"]
+                return self._index
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        self._index = self._scan()
+        self._save_index()
+        return self._index
+
+    def _scan(self) -> dict:
+        """Builds the offset index by streaming through the bank file."""
+        index = {}
+        if not os.path.exists(self.path):
+            return index
+
+        with open(self.path, "rb") as file:
+            offset = 0
+            for line in file:
+                if line.endswith(b"\n"):
+                    question = json.loads(line)
+                    key = QuestionCache.make_key(question["category_id"], question["difficulty"], question["type"])
+                    index.setdefault(key, []).append(offset)
+                offset += len(line)
+        return index
+
+    def _save_index(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        atomic_write(self.index_path, json.dumps({"size": size, "keys": self._index}))
+
+
+class _BankWriter:
+    """Appends decoded, de-duplicated questions to a bank and keeps its index current."""
+
+    def __init__(self, bank):
+        self.bank = bank
+        self.file = None
+        self.hashes = set()
+
+    def __enter__(self):
+        index = self.bank._load_index()
+
+        # Remember what is already in the bank so re-imports don't add duplicates
+        if index:
+            with open(self.bank.path, "rb") as file:
+                for line in file:
+                    if line.endswith(b"\n"):
+                        self.hashes.add(question_hash(Question.from_dict(json.loads(line))))
+
+        self.file = open(self.bank.path, "ab")
+        return self
+
+    def add(self, category_id, raw) -> int:
+        """Writes one API question to the bank. Returns 1 if it was new, else 0."""
+        question = Question.from_api(raw, category_id)
+
+        digest = question_hash(question)
+        if digest in self.hashes:
+            return 0
+        self.hashes.add(digest)
+
+        offset = self.file.tell()
+        self.file.write((json.dumps(question.to_dict(), separators=(",", ":")) + "\n").encode())
+
+        key = QuestionCache.make_key(category_id, question.difficulty, question.q_type)
+        self.bank._index.setdefault(key, []).append(offset)
+        self.bank._pools.pop(key, None)
+        return 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        self.bank._save_index()
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_bank() -> QuestionBank:
+    """Returns the question bank shared by the whole process, creating it on first use."""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank()
+        return _bank
+
+
+if __name__ == "__main__":
+    bank = get_bank()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "import":
+        from triviaApi import categories
+        ids = sys.argv[2:]
+        if ids == ["all"]:
+            ids = [i + 9 for i in range(len(categories))]
+        print(f"Added {bank.import_from_api([int(i) for i in ids])} questions.")
+    elif command == "import-file":
+        print(f"Added {bank.import_from_file(sys.argv[2], int(sys.argv[3]))} questions.")
+    else:
+        with bank._lock:
+            index = bank._load_index()
+        for key in sorted(index):
+            print(f"{key}: {len(index[key])}")
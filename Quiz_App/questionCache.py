@@ -0,0 +1,150 @@
+"""
+questionCache.py
+----------------------
+This module defines the QuestionCache class, a persistent on-disk cache
+of quiz questions keyed by (category id, difficulty, question type).
+
+Questions are stored already HTML-decoded, and are kept in memory as
+Question records. Entries expire after a TTL,
+but an expired entry is still served when the API can't be reached. The
+cache holds a bounded number of entries and evicts the least recently
+used one when it is full.
+
+Lookups are counted in the metrics registry as question_cache.hits,
+question_cache.stale_hits and question_cache.misses, so they show up in
+the metrics overlay and export.
+
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from config import QUESTION_CACHE_FILE, QUESTION_CACHE_TTL, QUESTION_CACHE_SIZE
+from fileLock import atomic_write
+from metrics import get_metrics
+from question import Question
+
+
+class QuestionCache:
+    """
+    QuestionCache keeps decoded question sets on disk, with a TTL and LRU eviction.
+
+    Attributes:
+        path (str): Path to the JSON cache file.
+        ttl (float): Seconds an entry is served before a fresh fetch is needed.
+        max_entries (int): Maximum number of (category, difficulty, type) entries.
+    """
+
+    def __init__(self, path=QUESTION_CACHE_FILE, ttl=QUESTION_CACHE_TTL, max_entries=QUESTION_CACHE_SIZE):
+        """
+        Initializes the cache and loads any entries saved by a previous run.
+
+        Args:
+            path (str): Path to the JSON cache file.
+            ttl (float): Seconds an entry stays fresh.
+            max_entries (int): Maximum number of entries kept.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._load()
+
+    @staticmethod
+    def make_key(category_id, difficulty, q_type) -> str:
+        """Returns the cache key for a category, difficulty and question type."""
+        return f"{category_id}:{difficulty}:{q_type}"
+
+    @staticmethod
+    def parse_key(key) -> tuple:
+        """Returns the (category_id, difficulty, q_type) tuple a key was built from."""
+        category_id, difficulty, q_type = key.split(":")
+        return int(category_id), difficulty, q_type
+
+    def get(self, key, allow_stale=False):
+        """
+        Looks up the questions cached under a key.
+
+        Args:
+            key (str): A key built with make_key.
+            allow_stale (bool): Also return an expired entry. Defaults to False.
+
+        Returns:
+            list: The cached Question records, or None on a miss.
+        """
+        metrics = get_metrics()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.count("question_cache.misses")
+                return None
+
+            if time.time() - entry["fetched"] > self.ttl:
+                if not allow_stale:
+                    metrics.count("question_cache.misses")
+                    return None
+                metrics.count("question_cache.stale_hits")
+            else:
+                metrics.count("question_cache.hits")
+
+            self._entries.move_to_end(key)
+            return list(entry["questions"])
+
+    def put(self, key, questions):
+        """
+        Stores questions under a key and saves the cache to disk.
+
+        Args:
+            key (str): A key built with make_key.
+            questions (list): Question records.
+        """
+        with self._lock:
+            self._entries[key] = {"fetched": time.time(), "questions": list(questions)}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def recent(self, n) -> list:
+        """Returns the (category_id, difficulty, q_type) tuples of the n most recently used entries."""
+        with self._lock:
+            keys = list(self._entries)[-n:] if n > 0 else []
+        return [self.parse_key(key) for key in reversed(keys)]
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print("Question cache is corrupt, starting with an empty cache.")
+            return
+
+        # Entries are saved least recently used first
+        for key, entry in saved.get("entries", []):
+            entry["questions"] = [Question.from_dict(q) for q in entry["questions"]]
+            self._entries[key] = entry
+
+    def _save(self):
+        try:
+            entries = [(key, {"fetched": entry["fetched"], "questions": [q.to_dict() for q in entry["questions"]]})
+                       for key, entry in self._entries.items()]
+            atomic_write(self.path, json.dumps({"entries": entries}))
+        except OSError as e:
+            print(f"Could not save the question cache: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> QuestionCache:
+    """Returns the question cache shared by the whole process, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QuestionCache()
+        return _cache
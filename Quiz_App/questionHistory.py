@@ -0,0 +1,161 @@
+"""
+questionHistory.py
+----------------------
+This module defines the QuestionHistory class, which remembers for each
+user the Open Trivia Database session token and which questions they
+have already been shown.
+
+With a session token the API never sends the same question twice until
+the token is exhausted. The local record of seen questions (kept as short
+hashes) also filters out repeats that come from the question cache or
+from before a token was reset.
+
+Using a token and being shown questions happen on every fetch and every
+quiz, so they only change the history in memory; flush() writes it once,
+when a quiz ends or is left. A new token is written right away.
+
+"""
+
+import hashlib
+import json
+import threading
+import time
+from config import QUESTION_HISTORY_FILE, SEEN_QUESTIONS_LIMIT
+from fileLock import atomic_write
+
+# The API deletes tokens that haven't been used for six hours
+TOKEN_LIFETIME = 6 * 60 * 60
+
+
+def question_hash(question) -> str:
+    """Returns a short, stable hash identifying a Question."""
+    text = question.text + "\0" + question.correct_answer
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class QuestionHistory:
+    """
+    QuestionHistory stores each user's session token and seen questions.
+
+    Users are identified by an owner string, normally the username.
+
+    Attributes:
+        path (str): Path to the JSON file holding the history.
+        seen_limit (int): Maximum number of seen question hashes kept per user.
+    """
+
+    def __init__(self, path=QUESTION_HISTORY_FILE, seen_limit=SEEN_QUESTIONS_LIMIT):
+        """
+        Initializes the history and loads it from disk.
+
+        Args:
+            path (str): Path to the JSON history file.
+            seen_limit (int): Maximum number of seen question hashes kept per user.
+        """
+        self.path = path
+        self.seen_limit = seen_limit
+        self._lock = threading.Lock()
+        self._owners = {}
+        self._dirty = False
+        self._load()
+
+    def token(self, owner):
+        """Returns the owner's session token, or None if it is missing or expired."""
+        with self._lock:
+            record = self._owners.get(owner, {})
+            if time.time() - record.get("token_used", 0) > TOKEN_LIFETIME:
+                return None
+            return record.get("token")
+
+    def set_token(self, owner, token):
+        """Stores a new or reset session token for the owner."""
+        with self._lock:
+            record = self._record(owner)
+            record["token"] = token
+            record["token_used"] = time.time()
+            self._save()
+
+    def touch_token(self, owner):
+        """Records that the owner's token was just used, which keeps it alive. Written by flush()."""
+        with self._lock:
+            self._record(owner)["token_used"] = time.time()
+            self._dirty = True
+
+    def has_seen(self, owner, question) -> bool:
+        """Returns True if the owner was already shown the question."""
+        with self._lock:
+            return question_hash(question) in self._owners.get(owner, {}).get("seen", {})
+
+    def filter_unseen(self, owner, questions) -> list:
+        """
+        Drops the questions the owner was already shown.
+
+        Args:
+            owner (str): The user the questions are for.
+            questions (list): Question records.
+
+        Returns:
+            list: The questions the owner hasn't seen, in their original order.
+        """
+        with self._lock:
+            seen = self._owners.get(owner, {}).get("seen", {})
+            return [q for q in questions if question_hash(q) not in seen]
+
+    def mark_seen(self, owner, questions):
+        """Records that the owner was shown these questions. Written by flush()."""
+        with self._lock:
+            seen = self._record(owner)["seen"]
+            for q in questions:
+                digest = question_hash(q)
+                if digest not in seen:
+                    seen[digest] = None
+                    self._dirty = True
+
+            # Forget the oldest hashes first
+            while len(seen) > self.seen_limit:
+                del seen[next(iter(seen))]
+
+    def flush(self):
+        """Writes the history to disk if it changed since it was last written."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _record(self, owner) -> dict:
+        return self._owners.setdefault(owner, {"token": None, "token_used": 0, "seen": {}})
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print("Question history is corrupt, starting with an empty history.")
+            return
+
+        for owner, record in saved.items():
+            # Seen hashes are kept as an insertion-ordered set
+            record["seen"] = dict.fromkeys(record.get("seen", []))
+            self._owners[owner] = record
+
+    def _save(self):
+        saved = {owner: dict(record, seen=list(record["seen"])) for owner, record in self._owners.items()}
+        try:
+            atomic_write(self.path, json.dumps(saved))
+            self._dirty = False
+        except OSError as e:
+            print(f"Could not save the question history: {e}")
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> QuestionHistory:
+    """Returns the question history shared by the whole process, creating it on first use."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = QuestionHistory()
+        return _history
@@ -0,0 +1,265 @@
+"""
+questionStream.py
+----------------------
+This module defines the QuestionStream class, which hands a quiz its
+questions one at a time, and the batch loaders it draws them from.
+
+A quiz starts from a first batch of questions. Whenever the stream's
+buffer runs low, the next batch is fetched on a background thread while
+the player is still answering, so a long quiz never waits between
+questions and never holds more than a couple of batches in memory. A quiz
+length of 0 is a marathon: the stream keeps going until its source runs
+dry.
+
+"""
+
+import random
+import threading
+from collections import deque
+import requests
+from config import QUIZ_LENGTH, QUESTION_SOURCE
+from metrics import get_metrics
+from prefetch import get_prefetcher
+from questionBank import get_bank
+from questionCache import QuestionCache, get_cache
+from question import Question
+from questionHistory import get_history
+from triviaApi import RateLimitError, fetch_questions
+
+# Number of questions fetched per batch; the API serves at most 50
+STREAM_BATCH_SIZE = 10
+
+# A refill starts once this few questions are left in the buffer
+STREAM_LOW_WATER = 3
+
+# Empty refills in a row after which the source is considered dry
+STREAM_MAX_FAILURES = 3
+
+
+class QuestionStream:
+    """
+    QuestionStream serves a quiz's questions and refills itself in the background.
+
+    Attributes:
+        length (int): Number of questions in the quiz, or 0 for a marathon.
+        served (int): Number of questions handed out so far.
+    """
+
+    def __init__(self, first_batch, supply, length=QUIZ_LENGTH, batch_size=STREAM_BATCH_SIZE,
+                 low_water=STREAM_LOW_WATER):
+        """
+        Initializes the stream with its first batch.
+
+        Args:
+            first_batch (list): The questions the quiz starts with.
+            supply (callable): Takes a number of questions and returns a list
+                of up to that many new ones. Called on a background thread,
+                so it must not touch widgets.
+            length (int): Number of questions in the quiz, or 0 for a marathon.
+            batch_size (int): Number of questions asked from supply at a time.
+            low_water (int): Buffer size at which the next batch is fetched.
+        """
+        self.length = length
+        self.served = 0
+        self._supply = supply
+        self._batch_size = batch_size
+        self._low_water = low_water
+        self._buffer = deque(first_batch[:length] if length else first_batch)
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._failures = 0
+        self._dry = False
+
+    def next_question(self):
+        """
+        Returns the next question without blocking.
+
+        Returns:
+            Question: The next question, or None if none is ready. Check
+            finished() to tell a quiz that ended from a refill in progress.
+        """
+        with self._lock:
+            question = None
+            if self._buffer:
+                question = self._buffer.popleft()
+                self.served += 1
+            self._maybe_refill()
+            return question
+
+    def finished(self) -> bool:
+        """Returns True once every question was served and no more are coming."""
+        with self._lock:
+            return not self._buffer and not self._refilling and (self._dry or self._wanted() <= 0)
+
+    def _wanted(self) -> int:
+        """Returns how many questions the next refill should ask for. Needs the lock."""
+        if not self.length:
+            return self._batch_size
+        return min(self._batch_size, self.length - self.served - len(self._buffer))
+
+    def _maybe_refill(self):
+        """Starts a background refill if the buffer is low. Needs the lock."""
+        if self._refilling or self._dry or len(self._buffer) > self._low_water:
+            return
+
+        wanted = self._wanted()
+        if wanted > 0:
+            self._refilling = True
+            threading.Thread(target=self._refill, args=(wanted,), daemon=True).start()
+
+    def _refill(self, wanted):
+        """Fetches a batch on the background thread and adds it to the buffer."""
+        try:
+            questions = self._supply(wanted)
+        except Exception as e:
+            print(f"Error while loading more questions: {e}")
+            questions = []
+
+        with self._lock:
+            self._refilling = False
+            if questions:
+                self._buffer.extend(questions[:wanted])
+                self._failures = 0
+            else:
+                self._failures += 1
+                self._dry = self._failures >= STREAM_MAX_FAILURES
+            self._maybe_refill()
+
+
+def load_batch(category_id, difficulty, amount, owner=None, use_prefetch=True) -> list:
+    """
+    Loads questions from a prefetched set, the cache, or the API, in that order.
+
+    Runs on a worker thread. If the API can't be reached or keeps rate
+    limiting the request, a stale cached set is used instead.
+
+    Args:
+        category_id (int): The API's category id.
+        difficulty (str): "easy", "medium" or "hard".
+        amount (int): Number of questions wanted.
+        owner (str, optional): The user playing. Questions they have seen
+            are skipped. Defaults to None.
+        use_prefetch (bool): Try a prefetched set first. Defaults to True.
+
+    Returns:
+        list: Up to amount questions, or an empty list if the request failed.
+    """
+    q_type = "multiple"
+    metrics = get_metrics()
+
+    if use_prefetch:
+        prefetched = filter_unseen(get_prefetcher().take((category_id, difficulty, q_type)) or [], owner)
+        if prefetched:
+            metrics.count("questions.from_prefetch")
+            return prefetched[:amount]
+
+    cache = get_cache()
+    cache_key = QuestionCache.make_key(category_id, difficulty, q_type)
+    cached = filter_unseen(cache.get(cache_key) or [], owner)
+    if cached:
+        metrics.count("questions.from_cache")
+        random.shuffle(cached)
+        return cached[:amount]
+
+    try:
+        with metrics.timer("questions.fetch"):
+            questions = fetch_questions(category_id, difficulty, amount, q_type, owner=owner)
+        cache.put(cache_key, questions)
+        metrics.count("questions.from_api")
+        return questions  # Return questions if everything is fine
+
+    except requests.exceptions.ConnectionError:
+        print("Error: Unable to connect to the API. Check your internet connection.")
+        metrics.count("questions.from_stale_cache")
+        return (cache.get(cache_key, allow_stale=True) or [])[:amount]
+    except requests.exceptions.Timeout:
+        print("Error: The request timed out. Try again later.")
+        metrics.count("questions.from_stale_cache")
+        return (cache.get(cache_key, allow_stale=True) or [])[:amount]
+    except requests.exceptions.RequestException as e:
+        print(f"HTTP Error: {e}")
+        metrics.count("questions.from_stale_cache")
+        return (cache.get(cache_key, allow_stale=True) or [])[:amount]
+    except RateLimitError as e:
+        print(f"API Error: {e}")
+        metrics.count("questions.from_stale_cache")
+        return (cache.get(cache_key, allow_stale=True) or [])[:amount]
+    except ValueError as e:
+        print(f"API Error: {e}")
+    except KeyError:
+        print("Error: Unexpected response format from the API.")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    metrics.count("questions.failed")
+    return []
+
+
+def load_from_server(category_id, difficulty, amount, owner=None) -> list:
+    """
+    Loads questions from the quiz server. Runs on a worker thread.
+
+    Returns:
+        list: Up to amount questions, or an empty list if the request failed.
+    """
+    from remoteStore import get_connection
+
+    try:
+        with get_metrics().timer("questions.server"):
+            questions = get_connection("questions").call(
+                "questions", category_id=category_id, difficulty=difficulty, amount=amount, owner=owner
+            )
+        return [Question.from_dict(question) for question in questions]
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load questions from the quiz server: {e}")
+        return []
+
+
+def sample_bank(category_id, difficulty, amount, owner=None) -> list:
+    """Draws questions from the local question bank, preferring questions the user hasn't seen."""
+    bank = get_bank()
+
+    questions = []
+    if owner is not None:
+        questions = bank.sample(category_id, difficulty, "multiple", amount,
+                                skip=lambda q: get_history().has_seen(owner, q))
+
+    # Repeat questions once the user has seen everything the bank has
+    return questions or bank.sample(category_id, difficulty, "multiple", amount)
+
+
+def filter_unseen(questions, owner) -> list:
+    """Drops the questions a user was already shown."""
+    if owner is None:
+        return questions
+    return get_history().filter_unseen(owner, questions)
+
+
+def make_supply(category_id, difficulty, owner=None, source=QUESTION_SOURCE):
+    """
+    Returns a supply function for a QuestionStream.
+
+    Every batch it returns is marked as seen by the owner, so later batches
+    of the same quiz don't repeat it.
+
+    Args:
+        category_id (int): The API's category id.
+        difficulty (str): "easy", "medium" or "hard".
+        owner (str, optional): The user playing. Defaults to None.
+        source (str): "api", "bank" or "server". Defaults to QUESTION_SOURCE from config.py.
+
+    Returns:
+        callable: Takes a number of questions and returns a list of them.
+    """
+    def supply(amount):
+        if source == "bank":
+            questions = sample_bank(category_id, difficulty, amount, owner)
+        elif source == "server":
+            questions = load_from_server(category_id, difficulty, amount, owner)
+        else:
+            questions = load_batch(category_id, difficulty, amount, owner)
+        if owner is not None:
+            get_history().mark_seen(owner, questions)
+        return questions
+
+    return supply
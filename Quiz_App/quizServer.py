@@ -0,0 +1,347 @@
+"""
+quizServer.py
+----------------------
+This module defines the QuizServer class, an optional asyncio server
+that lets many Quiz Game clients share one users database, one
+leaderboard and one question supply.
+
+Clients connect with remoteStore.py (STORAGE_BACKEND = "remote" and, for
+questions, QUESTION_SOURCE = "server" in config.py). Each request is one
+line of JSON, {"op": ..., ...params}, answered by one line,
+{"ok": true, "result": ...} or {"ok": false, "error": ..., "type": ...}.
+
+A connection may only add points to the user who logged in or signed up
+on it, as whole numbers of at most SERVER_MAX_POINTS_PER_REQUEST at a
+time, so one client can't forge another player's score.
+
+Users are kept in the server's own store (SERVER_STORAGE_BACKEND), which
+is only ever touched from a single worker thread, so it needs no extra
+locking. Score increments from all clients are merged in memory and
+written in one batch every SERVER_FLUSH_INTERVAL seconds, so hundreds of
+players scoring at once cost one write per interval. Question requests
+run on a separate thread pool, since they may wait for the trivia API,
+and so does password hashing, so a burst of logins doesn't hold up the
+store thread for every other client.
+
+Usage:
+    python quizServer.py [--host 127.0.0.1] [--port 8765] [--backend json|sqlite|sharded]
+
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import SERVER_HOST, SERVER_PORT, SERVER_FLUSH_INTERVAL, SERVER_STORAGE_BACKEND, SERVER_MAX_POINTS_PER_REQUEST
+from passwords import hash_password, needs_rehash, verify_password
+from userStore import UserExistsError
+
+# Threads serving question requests
+QUESTION_WORKERS = 4
+
+# Threads hashing and checking passwords; hashlib releases the GIL, so they run in parallel
+PASSWORD_WORKERS = os.cpu_count() or 4
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_SIZE = 1 << 20
+
+
+class QuizServer:
+    """
+    QuizServer answers login, signup, score, leaderboard and question requests.
+
+    Attributes:
+        store (UserStore): The users database shared by every client.
+        host (str): The address to listen on.
+        port (int): The port to listen on. 0 picks a free port, which is
+            stored here once the server started.
+        flush_interval (float): Seconds between batched score writes.
+    """
+
+    def __init__(self, store, host=SERVER_HOST, port=SERVER_PORT, flush_interval=SERVER_FLUSH_INTERVAL):
+        """
+        Initializes the server without listening yet.
+
+        Args:
+            store (UserStore): The users database shared by every client.
+            host (str): The address to listen on.
+            port (int): The port to listen on, or 0 for any free port.
+            flush_interval (float): Seconds between batched score writes.
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store")
+        self._question_executor = ThreadPoolExecutor(max_workers=QUESTION_WORKERS, thread_name_prefix="questions")
+        self._password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="passwords")
+        self._pending = {}
+        self._flush_lock = None
+        self._flush_task = None
+        self._server = None
+        self._loop = None
+        self._clients = {}
+        self._logins = {}
+
+        self._handlers = {
+            "login": self.op_login,
+            "signup": self.op_signup,
+            "exists": self.op_exists,
+            "get": self.op_get,
+            "count": self.op_count,
+            "ranked": self.op_ranked,
+            "rank": self.op_rank,
+            "count_ahead": self.op_count_ahead,
+            "users": self.op_users,
+            "points": self.op_points,
+            "flush": self.op_flush,
+            "questions": self.op_questions,
+        }
+
+    async def start(self):
+        """Starts listening and the periodic score flush."""
+        self._loop = asyncio.get_running_loop()
+        self._flush_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=MAX_REQUEST_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        print(f"Quiz server listening on {self.host}:{self.port}")
+
+    async def close(self):
+        """Stops listening, disconnects every client and writes the scores still pending."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        if self._server is not None:
+            self._server.close()
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        await self.flush()
+        self._store_executor.shutdown()
+        self._question_executor.shutdown(wait=False)
+        self._password_executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        """Runs the server until the task is cancelled."""
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+
+    def start_in_thread(self):
+        """
+        Runs the server on its own event loop in a background thread.
+
+        Returns once the server is listening, so self.port is set.
+        """
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+
+    def stop_thread(self):
+        """Stops a server started with start_in_thread once the pending scores are written."""
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def handle_client(self, reader, writer):
+        """Answers one client's requests, in order, until it disconnects."""
+        client = asyncio.current_task()
+        self._clients[client] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+
+                response = await self.dispatch(line)
+                writer.write((json.dumps(response, separators=(",", ":")) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.pop(client, None)
+            self._logins.pop(client, None)
+            writer.close()
+
+    async def dispatch(self, line) -> dict:
+        """Runs one request line and builds its response."""
+        try:
+            request = json.loads(line)
+            handler = self._handlers.get(request.pop("op", None))
+            if handler is None:
+                raise ValueError("Unknown request")
+            return {"ok": True, "result": await handler(**request)}
+        except UserExistsError as e:
+            return {"ok": False, "error": str(e), "type": "UserExistsError"}
+        except ValueError as e:
+            return {"ok": False, "error": str(e), "type": "ValueError"}
+        except Exception as e:
+            print(f"Request failed: {e!r}")
+            return {"ok": False, "error": str(e), "type": type(e).__name__}
+
+    async def _in_store(self, func, *args):
+        """Runs a store call on the store's worker thread."""
+        return await self._loop.run_in_executor(self._store_executor, func, *args)
+
+    async def _in_password_pool(self, func, *args):
+        """Runs a password hash or check on a password worker thread."""
+        return await self._loop.run_in_executor(self._password_executor, func, *args)
+
+    def _with_pending(self, user):
+        """Returns a user's record without the password and with their unwritten points."""
+        if user is None:
+            return None
+        user = {key: value for key, value in user.items() if key != "password"}
+        user["points"] += self._pending.get(user["username"], 0)
+        return user
+
+    async def op_login(self, username, password):
+        """
+        Checks credentials like UserStore.authenticate, hashing off the store
+        thread. On success the connection is logged in as the user.
+        """
+        user = await self._in_store(self.store.get, username)
+        if user is None or not await self._in_password_pool(verify_password, str(password), user["password"]):
+            return None
+
+        if needs_rehash(user["password"]):
+            password_hash = await self._in_password_pool(hash_password, str(password))
+            try:
+                await self._in_store(self.store.set_password, username, password_hash)
+            except OSError as e:
+                print(f"Could not upgrade the stored password of {username}: {e}")
+        self._logins[asyncio.current_task()] = user["username"]
+        return self._with_pending(user)
+
+    async def op_signup(self, username, password):
+        """
+        Signs up a user like UserStore.create_user, hashing off the store
+        thread. The connection is then logged in as the new user.
+        """
+        username = str(username)
+        if await self._in_store(self.store.exists, username):
+            raise UserExistsError(f"Username already exists: {username}")
+
+        user = {"username": username, "password": await self._in_password_pool(hash_password, str(password)), "points": 0}
+        await self._in_store(self.store.add, user)
+        self._logins[asyncio.current_task()] = username
+        return self._with_pending(user)
+
+    async def op_exists(self, username):
+        return await self._in_store(self.store.exists, username)
+
+    async def op_get(self, username):
+        return self._with_pending(await self._in_store(self.store.get, username))
+
+    async def op_count(self):
+        return await self._in_store(self.store.count)
+
+    async def op_ranked(self, start, stop):
+        users = await self._in_store(self.store.ranked, int(start), int(stop))
+        return [{key: value for key, value in user.items() if key != "password"} for user in users]
+
+    async def op_rank(self, username):
+        return await self._in_store(self.store.rank, username)
+
+    async def op_count_ahead(self, points, username):
+        return await self._in_store(self.store.count_ahead, int(points), str(username))
+
+    async def op_users(self):
+        users = await self._in_store(self.store.users)
+        return [{key: value for key, value in user.items() if key != "password"} for user in users]
+
+    async def op_points(self, increments):
+        """
+        Queues score increments for the next batched write.
+
+        Every increment is checked before any is queued, so a rejected
+        request queues nothing.
+
+        Raises:
+            ValueError: If the connection isn't logged in, an increment is
+                for another user, or one isn't a whole number from 0 to
+                SERVER_MAX_POINTS_PER_REQUEST.
+        """
+        player = self._logins.get(asyncio.current_task())
+        if player is None:
+            raise ValueError("Log in before adding points")
+        if not isinstance(increments, dict):
+            raise ValueError("Points must map usernames to points")
+
+        batch = {}
+        for username, points in increments.items():
+            if username != player:
+                raise ValueError(f"Can't add points to another user: {username}")
+            # bool is an int too, but never a score
+            if type(points) is not int or not 0 <= points <= SERVER_MAX_POINTS_PER_REQUEST:
+                raise ValueError(f"Points must be a whole number from 0 to {SERVER_MAX_POINTS_PER_REQUEST}")
+            batch[username] = points
+
+        for username, points in batch.items():
+            self._pending[username] = self._pending.get(username, 0) + points
+
+    async def op_flush(self):
+        await self.flush()
+
+    async def op_questions(self, category_id, difficulty, amount, owner=None):
+        questions = await self._loop.run_in_executor(
+            self._question_executor, _load_questions, int(category_id), difficulty, int(amount), owner
+        )
+        return [question.to_dict() for question in questions]
+
+    async def flush(self):
+        """Writes every queued score increment in one store write."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await self._in_store(self.store.add_points, batch)
+            except Exception as e:
+                print(f"Could not write scores, keeping them for the next flush: {e!r}")
+                for username, points in batch.items():
+                    self._pending[username] = self._pending.get(username, 0) + points
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def _load_questions(category_id, difficulty, amount, owner):
+    """Loads a batch of questions on a question worker thread."""
+    from questionStream import load_batch
+    return load_batch(category_id, difficulty, amount, owner)
+
+
+if __name__ == "__main__":
+    from userStore import get_store
+
+    parser = argparse.ArgumentParser(description="Serve a shared users database and questions to Quiz Game clients.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--backend", choices=["json", "sqlite", "sharded"], default=SERVER_STORAGE_BACKEND)
+    args = parser.parse_args()
+
+    server = QuizServer(get_store(args.backend), args.host, args.port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
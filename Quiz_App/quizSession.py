@@ -0,0 +1,198 @@
+"""
+quizSession.py
+----------------------
+This module defines the QuizSession class, the quiz engine behind the
+game screen. It has no GUI dependencies.
+
+A session walks through a quiz's questions, shuffles each question's
+answers, checks the player's picks and keeps the score. Points are
+reported through a callback, so the caller decides how they are stored
+(the game screen batches them in a ScoreBuffer). Because it needs no
+display, the same engine can drive simulated players for load tests or
+serve another front-end.
+
+Usage:
+    python quizSession.py [--sessions 10000] [--questions 10]   (simulate players)
+
+"""
+
+import argparse
+import random
+import time
+from question import Question
+
+# Points a player earns for a correct answer
+POINTS_PER_CORRECT_ANSWER = 10
+
+
+class QuizSession:
+    """
+    QuizSession runs one player's quiz.
+
+    Attributes:
+        username (str): The player, or None for a guest whose points aren't kept.
+        question (Question): The question being asked, or None between questions.
+        choices (list): The current question's answers, in the order shown.
+        asked (int): Number of questions asked so far.
+        correct (int): Number of questions answered correctly.
+        score (int): Points earned in this session.
+    """
+
+    def __init__(self, questions, username=None, on_points=None, on_finish=None, rng=None):
+        """
+        Initializes a session. No question is asked until next_question is called.
+
+        Args:
+            questions: A QuestionStream, or any iterable of Question records.
+            username (str, optional): The player. Defaults to None.
+            on_points (callable, optional): Called with (username, points)
+                for every correct answer of a named player. Defaults to None.
+            on_finish (callable, optional): Called with the session once the
+                questions run out. Defaults to None.
+            rng (random.Random, optional): Shuffles the answers. Defaults to
+                the random module.
+        """
+        self.username = username
+        self.question = None
+        self.choices = []
+        self.asked = 0
+        self.correct = 0
+        self.score = 0
+
+        self._questions = questions if hasattr(questions, "next_question") else _IterableQuestions(questions)
+        self._on_points = on_points
+        self._on_finish = on_finish
+        self._rng = rng or random
+        self._tried = set()
+        self._finished = False
+
+    def next_question(self):
+        """
+        Moves on to the next question and shuffles its answers.
+
+        Returns:
+            Question: The new question, or None if none is ready. Check
+            finished() to tell the end of the quiz from a batch still loading.
+        """
+        question = self._questions.next_question()
+        self.question = question
+        self._tried = set()
+
+        if question is None:
+            self.choices = []
+            if not self._finished and self._questions.finished():
+                self._finished = True
+                if self._on_finish is not None:
+                    self._on_finish(self)
+            return None
+
+        self.choices = list(question.answers)
+        self._rng.shuffle(self.choices)
+        self.asked += 1
+        return question
+
+    def finished(self) -> bool:
+        """Returns True once the quiz ran out of questions."""
+        return self._finished
+
+    def answer(self, choice) -> bool:
+        """
+        Checks a pick for the current question and scores it.
+
+        A wrong pick can be followed by another one; the correct answer is
+        scored the first time it is picked.
+
+        Args:
+            choice (str): One of the current choices.
+
+        Returns:
+            bool: True if the pick is the correct answer.
+
+        Raises:
+            ValueError: If no question is being asked, the pick is not one of
+                the choices, or it was already picked.
+        """
+        if self.question is None:
+            raise ValueError("No question is being asked")
+        if choice not in self.choices:
+            raise ValueError(f"Not one of the choices: {choice}")
+        if choice in self._tried:
+            raise ValueError(f"Already picked: {choice}")
+        self._tried.add(choice)
+
+        if choice != self.question.correct_answer:
+            return False
+
+        self.correct += 1
+        self.score += POINTS_PER_CORRECT_ANSWER
+        if self.username is not None and self._on_points is not None:
+            self._on_points(self.username, POINTS_PER_CORRECT_ANSWER)
+        return True
+
+
+class _IterableQuestions:
+    """Serves a plain iterable of questions through the QuestionStream interface."""
+
+    def __init__(self, questions):
+        self._iterator = iter(questions)
+        self._done = False
+
+    def next_question(self):
+        question = next(self._iterator, None)
+        self._done = question is None
+        return question
+
+    def finished(self) -> bool:
+        return self._done
+
+
+def simulate(sessions, questions_per_session, seed=0) -> dict:
+    """
+    Plays many sessions with random picks and synthetic questions.
+
+    Args:
+        sessions (int): Number of sessions to play.
+        questions_per_session (int): Questions in each session.
+        seed (int): Seed for the picks and shuffles. Defaults to 0.
+
+    Returns:
+        dict: Totals of the run and the sessions played per second.
+    """
+    rng = random.Random(seed)
+    questions = [Question(f"Question {i}?", (f"right {i}", f"wrong {i}a", f"wrong {i}b", f"wrong {i}c"),
+                          "easy", "multiple", 9) for i in range(questions_per_session)]
+    points = {}
+
+    def add_points(username, amount):
+        points[username] = points.get(username, 0) + amount
+
+    start = time.perf_counter()
+    answered = 0
+    for n in range(sessions):
+        session = QuizSession(questions, f"player{n % 1000}", on_points=add_points, rng=rng)
+        while session.next_question() is not None:
+            # Keep picking until the right answer comes up, like a player would
+            for choice in rng.sample(session.choices, len(session.choices)):
+                answered += 1
+                if session.answer(choice):
+                    break
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sessions": sessions,
+        "answers": answered,
+        "points": sum(points.values()),
+        "seconds": elapsed,
+        "sessions_per_second": sessions / elapsed if elapsed else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate players against the quiz engine.")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    result = simulate(args.sessions, args.questions)
+    print(f"{result['sessions']} sessions, {result['answers']} answers, {result['points']} points "
+          f"in {result['seconds']:.2f}s ({result['sessions_per_second']:.0f} sessions/s)")
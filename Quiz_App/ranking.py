@@ -0,0 +1,229 @@
+"""
+ranking.py
+----------------------
+This module defines the RankIndex class, an incrementally maintained
+ranking of users by points.
+
+The ranking is an indexable skip list: every link also stores how many
+users it skips, so inserting, moving and removing a user, finding a user's
+rank and jumping to the user at a given rank all take O(log N). Reading K
+consecutive ranks costs O(log N + K), so the leaderboard never has to sort
+the whole population.
+
+"""
+
+import random
+
+MAX_LEVEL = 16
+LEVEL_PROBABILITY = 0.25
+
+
+class _Node:
+    """A skip list node. next[i] is the following node on level i and
+    width[i] the number of bottom-level steps it takes to get there."""
+
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class RankIndex:
+    """
+    RankIndex ranks usernames by points, highest first.
+
+    Users with equal points are ranked by username. Ranks are 1-based,
+    positions (as used by ranked) are 0-based.
+    """
+
+    def __init__(self):
+        """Initializes an empty ranking."""
+        self._head = _Node(None, MAX_LEVEL)
+        self._levels = 1
+        self._size = 0
+        self._keys = {}
+
+    def rebuild(self, entries):
+        """
+        Replaces the ranking with the given users in O(N log N).
+
+        This is much faster than N separate updates when loading a database.
+
+        Args:
+            entries (iterable): (username, points) pairs.
+        """
+        keys = sorted((-points, username) for username, points in entries)
+
+        self._head = _Node(None, MAX_LEVEL)
+        self._levels = 1
+        last = [self._head] * MAX_LEVEL
+        last_position = [0] * MAX_LEVEL
+
+        # Link the sorted nodes level by level, left to right
+        for position, key in enumerate(keys, 1):
+            level = self._random_level()
+            node = _Node(key, level)
+            for i in range(level):
+                last[i].next[i] = node
+                last[i].width[i] = position - last_position[i]
+                last[i] = node
+                last_position[i] = position
+            self._levels = max(self._levels, level)
+
+        for i in range(self._levels):
+            last[i].width[i] = len(keys) + 1 - last_position[i]
+
+        self._size = len(keys)
+        self._keys = {key[1]: key for key in keys}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, username):
+        return username in self._keys
+
+    def update(self, username, points):
+        """
+        Inserts a user or moves them to their new position.
+
+        Args:
+            username (str): The user to rank.
+            points (int): The user's current points.
+        """
+        key = (-points, username)
+        old_key = self._keys.get(username)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self._remove_key(old_key)
+        self._insert_key(key)
+        self._keys[username] = key
+
+    def remove(self, username):
+        """
+        Removes a user from the ranking.
+
+        Raises:
+            KeyError: If the user is not ranked.
+        """
+        self._remove_key(self._keys.pop(username))
+
+    def rank(self, username):
+        """
+        Returns a user's 1-based rank, or None if the user is not ranked.
+        """
+        key = self._keys.get(username)
+        if key is None:
+            return None
+        return self._count_before(key) + 1
+
+    def count_ahead(self, points, username) -> int:
+        """
+        Returns how many users rank ahead of the given points and username.
+
+        The user doesn't have to be ranked here, so this also places users
+        from another ranking, e.g. another shard's.
+        """
+        return self._count_before((-points, username))
+
+    def _count_before(self, key) -> int:
+        position, node = 0, self._head
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def ranked(self, start, stop) -> list:
+        """
+        Returns the users ranked at positions start (inclusive) to stop (exclusive).
+
+        Args:
+            start (int): 0-based position of the first user.
+            stop (int): 0-based position after the last user.
+
+        Returns:
+            list: (username, points) pairs, highest points first.
+        """
+        start = max(start, 0)
+        stop = min(stop, len(self._keys))
+        if start >= stop:
+            return []
+
+        # Walk down to the node at 1-based position start + 1
+        remaining, node = start + 1, self._head
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+
+        result = []
+        for _ in range(stop - start):
+            result.append((node.key[1], -node.key[0]))
+            node = node.next[0]
+        return result
+
+    def top(self, k) -> list:
+        """Returns the k best users as (username, points) pairs."""
+        return self.ranked(0, k)
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def _insert_key(self, key):
+        level = self._random_level()
+        if level > self._levels:
+            # Links on newly used head levels skip every existing node
+            for i in range(self._levels, level):
+                self._head.next[i] = None
+                self._head.width[i] = self._size + 1
+            self._levels = level
+
+        chain = [None] * self._levels
+        steps_at_level = [0] * self._levels
+        node = self._head
+        for i in reversed(range(self._levels)):
+            while node.next[i] is not None and node.next[i].key < key:
+                steps_at_level[i] += node.width[i]
+                node = node.next[i]
+            chain[i] = node
+
+        new_node = _Node(key, level)
+        steps = 0
+        for i in range(level):
+            prev = chain[i]
+            new_node.next[i] = prev.next[i]
+            prev.next[i] = new_node
+            new_node.width[i] = prev.width[i] - steps
+            prev.width[i] = steps + 1
+            steps += steps_at_level[i]
+
+        for i in range(level, self._levels):
+            chain[i].width[i] += 1
+        self._size += 1
+
+    def _remove_key(self, key):
+        chain = [None] * self._levels
+        node = self._head
+        for i in reversed(range(self._levels)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            chain[i] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for i in range(len(target.next)):
+            prev = chain[i]
+            prev.width[i] += target.width[i] - 1
+            prev.next[i] = target.next[i]
+
+        for i in range(len(target.next), self._levels):
+            chain[i].width[i] -= 1
+        self._size -= 1
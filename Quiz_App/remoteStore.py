@@ -0,0 +1,213 @@
+"""
+remoteStore.py
+----------------------
+This module defines the client side of the quiz server: RemoteConnection,
+which sends requests to a QuizServer, and RemoteUserStore, the "remote"
+backend of the UserStore interface.
+
+With STORAGE_BACKEND = "remote" in config.py, every screen reads and
+updates users through the server instead of a local file, so all clients
+share one users database and one leaderboard. With QUESTION_SOURCE =
+"server", quizzes are served by the server as well.
+
+Requests and responses are single lines of JSON over one TCP connection.
+Passwords are sent to the server to be checked, but never sent back.
+The server only accepts points for the user who logged in or signed up
+on the connection, so a connection that had to be reopened logs in again
+before anything else is sent.
+
+"""
+
+import json
+import socket
+import threading
+from config import SERVER_HOST, SERVER_PORT, SERVER_TIMEOUT
+from userStore import UserStore, UserExistsError
+
+# Requests that are safe to send again if the connection broke before the answer arrived
+RETRYABLE_OPS = {"login", "exists", "get", "count", "ranked", "rank", "count_ahead", "users", "questions"}
+
+
+class RemoteError(OSError):
+    """Raised when the server failed to handle a request."""
+
+
+class RemoteConnection:
+    """
+    RemoteConnection sends requests to a quiz server over a persistent connection.
+
+    Calls from several threads are sent one at a time.
+
+    Attributes:
+        host (str): The server's address.
+        port (int): The server's port.
+        timeout (float): Seconds to wait for an answer.
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, timeout=SERVER_TIMEOUT):
+        """
+        Initializes the connection. The server is contacted on the first call.
+
+        Args:
+            host (str): The server's address.
+            port (int): The server's port.
+            timeout (float): Seconds to wait for an answer.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._socket = None
+        self._file = None
+        self._login = None
+
+    def call(self, op, **params):
+        """
+        Sends a request and waits for its answer.
+
+        A broken connection is reopened. Read-only requests are sent again
+        on the new connection; a write whose answer was lost is not, since
+        the server may already have applied it.
+
+        Args:
+            op (str): The request, e.g. "login" or "ranked".
+            **params: The request's parameters.
+
+        Returns:
+            The request's result.
+
+        Raises:
+            UserExistsError: If a signup's username is already taken.
+            ValueError: If the server rejected the request.
+            RemoteError: If the server failed to handle the request.
+            OSError: If the server can't be reached.
+        """
+        line = (json.dumps({"op": op, **params}, separators=(",", ":")) + "\n").encode()
+
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._file is None:
+                        self._connect()
+                    self._file.write(line)
+                    self._file.flush()
+                    answer = self._file.readline()
+                    if not answer:
+                        raise ConnectionError("The quiz server closed the connection")
+                    break
+                except OSError:
+                    self.close()
+                    if attempt or op not in RETRYABLE_OPS:
+                        raise
+
+        response = json.loads(answer)
+        if response["ok"]:
+            if op in ("login", "signup") and response.get("result") is not None:
+                # Remembered to log in again on a new connection
+                self._login = (json.dumps({"op": "login", "username": params["username"],
+                                           "password": params["password"]}, separators=(",", ":")) + "\n").encode()
+            return response.get("result")
+        if response.get("type") == "UserExistsError":
+            raise UserExistsError(response["error"])
+        if response.get("type") == "ValueError":
+            raise ValueError(response["error"])
+        raise RemoteError(response["error"])
+
+    def close(self):
+        """Closes the connection. The next call opens a new one."""
+        if self._file is not None:
+            try:
+                self._file.close()
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._file = None
+
+    def _connect(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rwb")
+        if self._login is not None:
+            self._file.write(self._login)
+            self._file.flush()
+            if not self._file.readline():
+                raise ConnectionError("The quiz server closed the connection")
+
+
+class RemoteUserStore(UserStore):
+    """
+    RemoteUserStore reads and updates users through a quiz server.
+
+    Records returned by the server have no "password" key. The server
+    checks passwords and upgrades their hashes itself, so this store has no
+    set_password. Score points are batched by the server, so the
+    leaderboard can lag a new score by up to SERVER_FLUSH_INTERVAL seconds.
+
+    Every method waits for the server, up to SERVER_TIMEOUT seconds, so
+    screens call them from a worker thread (see worker.py).
+
+    Attributes:
+        connection (RemoteConnection): The connection to the server.
+    """
+
+    def __init__(self, connection=None):
+        """
+        Initializes the store.
+
+        Args:
+            connection (RemoteConnection, optional): The connection to use.
+                Defaults to the shared "store" connection.
+        """
+        self.connection = connection or get_connection("store")
+
+    def authenticate(self, username, password):
+        return self.connection.call("login", username=username, password=password)
+
+    def get(self, username):
+        return self.connection.call("get", username=username)
+
+    def exists(self, username) -> bool:
+        return self.connection.call("exists", username=username)
+
+    def users(self) -> list:
+        return self.connection.call("users")
+
+    def count(self) -> int:
+        return self.connection.call("count")
+
+    def ranked(self, start, stop) -> list:
+        return self.connection.call("ranked", start=start, stop=stop)
+
+    def rank(self, username):
+        return self.connection.call("rank", username=username)
+
+    def count_ahead(self, points, username) -> int:
+        return self.connection.call("count_ahead", points=points, username=username)
+
+    def create_user(self, username, password) -> dict:
+        return self.connection.call("signup", username=username, password=password)
+
+    def add(self, user):
+        """Signs up a user. The server hashes the password and starts them at 0 points."""
+        self.create_user(user["username"], user["password"])
+
+    def add_points(self, increments):
+        self.connection.call("points", increments=dict(increments))
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def get_connection(name="store") -> RemoteConnection:
+    """
+    Returns a connection to the configured server shared by the whole process.
+
+    Each name gets its own connection, so slow question requests don't hold
+    up user store requests.
+    """
+    with _connections_lock:
+        if name not in _connections:
+            _connections[name] = RemoteConnection()
+        return _connections[name]
@@ -0,0 +1,195 @@
+"""
+screenManager.py
+----------------------
+This module defines the App class, the single root window of the Quiz
+Game, and the Screen base class of the frames it shows.
+
+Each screen is built the first time it is shown and kept afterwards.
+Navigating hides the current frame and shows the next one, so moving
+between screens rebuilds no widgets, creates no new Tcl interpreter and
+never nests another main loop, however long the session runs.
+
+Only the first screen's module is imported before the window is drawn.
+The other screens, and the network code they pull in, are imported on a
+background thread once the first frame is up, so they are usually ready
+by the time the user navigates to them.
+
+"""
+
+import importlib
+import threading
+import customtkinter as ctk
+from metrics import get_metrics
+
+# Screen names, mapped to the module and class implementing them. A
+# screen's module is imported the first time the screen is shown.
+SCREENS = {
+    "login": ("loginScreen", "LoginApp"),
+    "signup": ("signUpScreen", "SignupApp"),
+    "home": ("homeScreen", "HomeScreen"),
+    "game": ("gameScreen", "GameScreen"),
+    "leaderboard": ("leaderboard", "LeaderboardScreen"),
+}
+
+# Screens whose modules are imported in the background after startup
+WARM_SCREENS = ["home", "game", "leaderboard", "signup"]
+
+# Milliseconds to wait after the first screen is shown before warming the others
+WARM_DELAY_MS = 200
+
+
+class Screen(ctk.CTkFrame):
+    """
+    Screen is the base class of every frame the App shows.
+
+    Attributes:
+        app (App): The root window showing the screen.
+        window_title (str): Window title while the screen is shown.
+        window_size (str): Window geometry while the screen is shown.
+        window_resizable (bool): Whether the window can be resized while the screen is shown.
+    """
+
+    window_title = "Quiz Game"
+    window_size = "400x500"
+    window_resizable = False
+
+    def __init__(self, app):
+        """
+        Initializes the screen's frame. Subclasses build their widgets here, once.
+
+        Args:
+            app (App): The root window showing the screen.
+        """
+        super().__init__(app, corner_radius=0, fg_color="transparent")
+        self.app = app
+
+    def on_show(self, **kwargs):
+        """Called every time the screen is shown, with the arguments passed to App.show."""
+
+    def on_hide(self):
+        """Called when another screen replaces this one or the window is closed."""
+
+
+class App(ctk.CTk):
+    """
+    App is the one root window of the Quiz Game. It swaps between cached screens.
+
+    Attributes:
+        current (Screen): The screen being shown, or None before the first one.
+    """
+
+    def __init__(self):
+        """Initializes the root window without showing any screen."""
+        super().__init__()
+
+        self.current = None
+        self._screens = {}
+        self._overlay = None
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        if get_metrics().enabled:
+            self.bind("<F12>", self.toggle_metrics)
+
+    def screen(self, name) -> Screen:
+        """
+        Returns a screen, building it on first use.
+
+        Args:
+            name (str): A key of SCREENS.
+
+        Raises:
+            KeyError: If there is no screen with that name.
+        """
+        screen = self._screens.get(name)
+        if screen is None:
+            module_name, class_name = SCREENS[name]
+            with get_metrics().timer(f"screen.build.{name}"):
+                screen_class = getattr(importlib.import_module(module_name), class_name)
+                screen = self._screens[name] = screen_class(self)
+        return screen
+
+    def show(self, name, **kwargs) -> Screen:
+        """
+        Hides the current screen and shows another one.
+
+        Args:
+            name (str): A key of SCREENS.
+            **kwargs: Passed on to the screen's on_show.
+
+        Returns:
+            Screen: The screen now shown.
+        """
+        screen = self.screen(name)
+
+        with get_metrics().timer(f"screen.show.{name}"):
+            if self.current is not None:
+                self.current.on_hide()
+                self.current.pack_forget()
+            self.current = screen
+
+            self.title(screen.window_title)
+            self.geometry(screen.window_size)
+            self.resizable(screen.window_resizable, screen.window_resizable)
+
+            screen.on_show(**kwargs)
+            screen.pack(fill="both", expand=True)
+        return screen
+
+    def warm(self, names=None):
+        """
+        Imports the modules of some screens on a background thread.
+
+        Only modules are imported; widgets are still built on the Tk thread
+        the first time a screen is shown.
+
+        Args:
+            names (list, optional): Keys of SCREENS. Defaults to WARM_SCREENS.
+        """
+        modules = [SCREENS[name][0] for name in (names or WARM_SCREENS)]
+        threading.Thread(target=_import_all, args=(modules,), daemon=True).start()
+
+    def toggle_metrics(self, event=None):
+        """Opens the metrics overlay, or closes it if it is open."""
+        if self._overlay is not None and self._overlay.winfo_exists():
+            self._overlay.destroy()
+            self._overlay = None
+        else:
+            from metricsOverlay import MetricsOverlay
+            self._overlay = MetricsOverlay(self)
+
+    def on_close(self):
+        """Lets the current screen save its state before the window is closed."""
+        if self.current is not None:
+            self.current.on_hide()
+
+        metrics = get_metrics()
+        if metrics.enabled:
+            try:
+                metrics.export()
+            except OSError as e:
+                print(f"Could not export metrics: {e}")
+
+        self.destroy()
+
+
+def _import_all(modules):
+    """Imports modules one by one, reporting but otherwise ignoring failures."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"Could not preload {module}: {e}")
+
+
+def run(name="login", **kwargs):
+    """
+    Opens the root window on a screen, warms the other screens and runs the main loop.
+
+    Args:
+        name (str): The first screen to show. Defaults to "login".
+        **kwargs: Passed on to the screen's on_show.
+    """
+    app = App()
+    app.show(name, **kwargs)
+    app.after(WARM_DELAY_MS, app.warm)
+    app.mainloop()
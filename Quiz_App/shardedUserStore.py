@@ -0,0 +1,259 @@
+"""
+shardedUserStore.py
+----------------------
+This module defines the ShardedUserStore class, the "sharded" backend of
+the UserStore interface, and the tool that migrates users into it.
+
+Users are spread over SHARD_COUNT JSON stores (users-000.json, ...) in
+SHARDS_DIR, picked by a CRC-32 of the username, which is the same in every
+process and on every run. Each shard has its own journal and its own lock,
+so signups and score updates for users on different shards never wait for
+each other, and each shard's snapshot, compactions and load are about
+1/SHARD_COUNT the size of a single users.json.
+
+The leaderboard is a merged view: each shard keeps its own ranking, the
+shards' offsets for a leaderboard position are found by counting the users
+ahead of a candidate in every shard, and the shards' slices from there are
+merged with heapq.merge.
+
+The number of shards is recorded in shards.json, written last when a
+directory is created. To create a sharded database from users.json, or to
+change the number of shards, run:
+
+    python shardedUserStore.py migrate [--source users.json] [--dir users_shards] [--shards 8]
+
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import zlib
+from config import SHARDS_DIR, SHARD_COUNT, JOURNAL_COMPACT_THRESHOLD, USERS_FILE
+from fileLock import FileLock, atomic_write
+from userStore import UserStore, JsonUserStore
+
+MANIFEST_FILE = "shards.json"
+
+
+def shard_of(username, count) -> int:
+    """Returns the shard a username belongs to, the same in every process."""
+    return zlib.crc32(username.encode("utf-8")) % count
+
+
+def shard_path(directory, index) -> str:
+    """Returns the path of a shard's snapshot."""
+    return os.path.join(directory, f"users-{index:03d}.json")
+
+
+def _leaderboard_key(user):
+    return -user["points"], user["username"]
+
+
+class ShardedUserStore(UserStore):
+    """
+    ShardedUserStore routes every user to one of several JSON stores.
+
+    Attributes:
+        directory (str): The directory holding the shards.
+        shard_count (int): The number of shards.
+        shards (list): The JsonUserStore of each shard.
+    """
+
+    def __init__(self, directory=SHARDS_DIR, count=SHARD_COUNT, import_from=None,
+                 compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        """
+        Opens the shards, creating them if the directory holds none.
+
+        Args:
+            directory (str): The directory holding the shards.
+            count (int): The number of shards to create a new directory with.
+            import_from (str, optional): JSON users file to import when the
+                shards are created. Defaults to None.
+            compact_threshold (int): Number of journal events that triggers
+                a compaction of a shard.
+
+        Raises:
+            ValueError: If the directory already holds another number of shards.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        with FileLock(os.path.join(directory, "shards.lock")):
+            found = read_manifest(directory)
+            if found is None:
+                users = JsonUserStore(import_from).users() if import_from and os.path.exists(import_from) else []
+                write_shards(directory, count, users)
+            elif found != count:
+                raise ValueError(f"{directory} holds {found} shards, not {count}; "
+                                 f"run 'python shardedUserStore.py migrate' to change the count")
+
+        self.shard_count = count
+        self.shards = [JsonUserStore(shard_path(directory, i), compact_threshold) for i in range(count)]
+
+    def shard(self, username) -> JsonUserStore:
+        """Returns the store a username belongs to."""
+        return self.shards[shard_of(username, self.shard_count)]
+
+    def files(self) -> list:
+        return [path for shard in self.shards for path in shard.files()]
+
+    def get(self, username):
+        return self.shard(username).get(username)
+
+    def exists(self, username) -> bool:
+        return self.shard(username).exists(username)
+
+    def users(self) -> list:
+        """Returns the records of all users, shard by shard, in signup order within each shard."""
+        return [user for shard in self.shards for user in shard.users()]
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards)
+
+    def ranked(self, start, stop) -> list:
+        start = max(start, 0)
+        if start >= stop:
+            return []
+
+        wanted = stop - start
+        runs = [shard.ranked(offset, offset + wanted) for shard, offset in zip(self.shards, self._offsets(start))]
+        return list(itertools.islice(heapq.merge(*runs, key=_leaderboard_key), wanted))
+
+    def rank(self, username):
+        user = self.get(username)
+        if user is None:
+            return None
+        return self.count_ahead(user["points"], username) + 1
+
+    def count_ahead(self, points, username) -> int:
+        return sum(shard.count_ahead(points, username) for shard in self.shards)
+
+    def _offsets(self, position) -> list:
+        """
+        Splits a leaderboard position between the shards.
+
+        Returns:
+            list: For each shard, how many of its users rank ahead of the
+            position. They add up to the position.
+        """
+        low = [0] * self.shard_count
+        high = [shard.count() for shard in self.shards]
+        if position <= 0:
+            return low
+        if position >= sum(high):
+            return high
+
+        # Each shard's answer lies in [low, high). Halve the widest range by
+        # placing its middle user on the merged leaderboard, until they close.
+        while True:
+            widest = max(range(self.shard_count), key=lambda i: high[i] - low[i])
+            if high[widest] == low[widest]:
+                return low
+
+            middle = (low[widest] + high[widest]) // 2
+            user = self.shards[widest].ranked(middle, middle + 1)[0]
+            ahead = [shard.count_ahead(user["points"], user["username"]) for shard in self.shards]
+            merged = sum(ahead)
+
+            if merged == position:
+                return ahead
+            if merged < position:
+                # This user and everyone ahead of them rank ahead of the position
+                low = [max(lo, a) for lo, a in zip(low, ahead)]
+                low[widest] = middle + 1
+            else:
+                high = [min(hi, a) for hi, a in zip(high, ahead)]
+
+    def add(self, user):
+        self.shard(user["username"]).add(user)
+
+    def add_points(self, increments):
+        """Adds points to several users with one write per shard touched."""
+        by_shard = {}
+        for username, points in increments.items():
+            by_shard.setdefault(shard_of(username, self.shard_count), {})[username] = points
+        for index, shard_increments in by_shard.items():
+            self.shards[index].add_points(shard_increments)
+
+    def set_password(self, username, password_hash):
+        """Replaces a user's stored password in their shard."""
+        self.shard(username).set_password(username, password_hash)
+
+
+def read_manifest(directory):
+    """Returns the number of shards recorded in a directory, or None if it holds no shards."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r") as file:
+            return json.load(file)["count"]
+    except FileNotFoundError:
+        return None
+
+
+def write_shards(directory, count, users):
+    """
+    Writes users into a new set of shards, replacing any shard files there.
+
+    The manifest is written last, so an interrupted run leaves a directory
+    that is created again from scratch the next time.
+    """
+    buckets = [[] for _ in range(count)]
+    for user in users:
+        buckets[shard_of(user["username"], count)].append(user)
+
+    for index, bucket in enumerate(buckets):
+        path = shard_path(directory, index)
+        if os.path.exists(path + ".journal"):
+            os.remove(path + ".journal")
+        atomic_write(path, json.dumps({"generation": 0, "data": bucket}, indent=4))
+
+    atomic_write(os.path.join(directory, MANIFEST_FILE), json.dumps({"count": count, "hash": "crc32"}))
+
+
+def migrate(source, directory, count) -> int:
+    """
+    Copies every user from a users file or a shard directory into new shards.
+
+    Args:
+        source (str): A JSON users file, or a directory of shards.
+        directory (str): The new shard directory. It must not hold shards yet.
+        count (int): The number of shards to create.
+
+    Returns:
+        int: The number of users migrated.
+
+    Raises:
+        ValueError: If the target directory already holds shards.
+        FileNotFoundError: If the source is a directory without a shard manifest.
+    """
+    if read_manifest(directory) is not None:
+        raise ValueError(f"{directory} already holds shards")
+
+    if os.path.isdir(source):
+        source_count = read_manifest(source)
+        if source_count is None:
+            raise FileNotFoundError(f"{source} holds no shards: {MANIFEST_FILE} is missing")
+        users = ShardedUserStore(source, source_count).users()
+    else:
+        users = JsonUserStore(source).users()
+
+    os.makedirs(directory, exist_ok=True)
+    with FileLock(os.path.join(directory, "shards.lock")):
+        write_shards(directory, count, users)
+    return len(users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the sharded users database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="copy users from a users file or shard directory into new shards")
+    migrate_parser.add_argument("--source", default=USERS_FILE)
+    migrate_parser.add_argument("--dir", default=SHARDS_DIR)
+    migrate_parser.add_argument("--shards", type=int, default=SHARD_COUNT)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        moved = migrate(args.source, args.dir, args.shards)
+        print(f"Migrated {moved} users from {args.source} into {args.shards} shards in {args.dir}")
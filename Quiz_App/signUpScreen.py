@@ -11,29 +11,40 @@ are stored in a JSON file.
 
 from tkinter import messagebox
 import customtkinter as ctk
-import json
-from homeScreen import HomeScreen
-from loginScreen import LoginApp
+from screenManager import Screen, run
+from userStore import UserExistsError, get_store
+from worker import BackgroundTask
 
 
-class SignupApp(ctk.CTk):
+class SignupApp(Screen):
     """
     SignupApp class provides a GUI for user registration.
 
     Users can enter their details to create an account, which is stored in a JSON file.
     """
 
-    def __init__(self, master=None):
-        super().__init__(master)
+    window_title = "Sign Up"
+    window_size = "400x550"
+    window_resizable = True
 
-        self.master = master
-
-        # Configure window
-        self.title("Sign Up")
-        self.geometry("400x550")
+    def __init__(self, app):
+        super().__init__(app)
 
+        self.signup_task = None
         self.init_GUI()
 
+    def on_show(self):
+        """Clears the passwords typed on the last visit."""
+        self.password_entry.delete(0, "end")
+        self.confirm_entry.delete(0, "end")
+
+    def on_hide(self):
+        """Stops waiting for a signup that is still running."""
+        if self.signup_task is not None:
+            self.signup_task.cancel()
+            self.signup_task = None
+            self.signup_button.configure(state="normal", text="Sign Up")
+
     def init_GUI(self):
         """Initializes and arranges GUI components."""
 
@@ -114,7 +125,10 @@ class SignupApp(ctk.CTk):
         self.login_link.bind("<Button-1>", self.back_to_login)
 
     def signup(self):
-        """Validates input fields and registers a new user."""
+        """Validates input fields and registers a new user on a worker thread."""
+
+        if self.signup_task is not None and self.signup_task.running():
+            return
 
         username = self.username_entry.get()
         password = self.password_entry.get()
@@ -129,37 +143,42 @@ class SignupApp(ctk.CTk):
             messagebox.showerror("Error", "Passwords do not match")
             return
 
-        try:
-            with open("users.json", "r") as file:
-                json_data = json.load(file)
-
-            for user in json_data["data"]:
-                if user["username"] == username:
-                    messagebox.showerror("Error", "Username already exists")
-                    return
+        # Hashing the password takes a noticeable moment, so it runs off the Tk thread
+        self.signup_button.configure(state="disabled", text="Signing up...")
+        self.signup_task = BackgroundTask(
+            self, lambda: get_store().create_user(username, password), self.on_signed_up, self.on_signup_failed
+        ).start()
 
-            new_user = {"username": username, "password": password, "points": 0}
-            json_data["data"].append(new_user)
+    def on_signed_up(self, new_user):
+        """Opens the home screen for the new user."""
+        self.signup_task = None
+        self.signup_button.configure(state="normal", text="Sign Up")
 
-            with open("users.json", "w") as file:
-                json.dump(json_data, file, indent=4)
+        messagebox.showinfo("Success", f"Account created successfully for {new_user['username']}!")
+        self.app.show("home", user=new_user)
 
-            messagebox.showinfo("Success", f"Account created successfully for {username}!")
-            self.destroy()
-            home = HomeScreen(new_user)
-            home.mainloop()
+    def on_signup_failed(self, error):
+        """Tells the user why the account could not be created."""
+        self.signup_task = None
+        self.signup_button.configure(state="normal", text="Sign Up")
 
-        except FileNotFoundError:
+        if isinstance(error, UserExistsError):
+            messagebox.showerror("Error", "Username already exists")
+        elif isinstance(error, FileNotFoundError):
             print("FILE NOT FOUND!! CHECK DATABASE...")
+        elif isinstance(error, ValueError):
+            # e.g. json.JSONDecodeError from a corrupt users file
+            messagebox.showerror("Error", f"The user database could not be read: {error}")
+        elif isinstance(error, OSError):
+            messagebox.showerror("Error", f"Could not reach the user database: {error}")
+        else:
+            raise error
 
     def back_to_login(self, event=None):
         """Handles transition back to the login screen."""
 
-        self.destroy()
-        app = LoginApp()
-        app.mainloop()
+        self.app.show("login")
 
 
 if __name__ == "__main__":
-    app = SignupApp()
-    app.mainloop()
\ No newline at end of file
+    run("signup")
\ No newline at end of file
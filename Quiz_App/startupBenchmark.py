@@ -0,0 +1,173 @@
+"""
+startupBenchmark.py
+----------------------
+A benchmark of how fast the Quiz Game starts.
+
+Every measurement runs in a fresh interpreter, so nothing is already in
+sys.modules:
+
+    import      time to import what main.py needs before the login window
+                is drawn, and which heavy modules that pulls in (it should
+                pull in none of them)
+    process     wall time of a whole interpreter doing that import
+    first_frame time from the first import to the login window's first
+                update (needs a display, skipped without one)
+
+A run can be saved as the baseline. Later runs are compared against it
+and the script exits with 1 if a metric got slower than the tolerance
+allows or a heavy module is imported eagerly again.
+
+Usage:
+    python startupBenchmark.py [--runs 5] [--save] [--baseline startup_baseline.json] [--tolerance 0.25]
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules the login window must not wait for
+HEAVY_MODULES = ["requests", "homeScreen", "gameScreen", "leaderboard", "triviaApi",
+                 "questionStream", "questionBank", "sqliteUserStore"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import screenManager, loginScreen
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+FRAME_PROBE = """
+import json, time
+start = time.perf_counter()
+try:
+    from screenManager import App
+    app = App()
+    app.show("login")
+    app.update()
+except Exception as e:
+    print(json.dumps({"error": str(e)}))
+else:
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+    app.destroy()
+"""
+
+
+def run_probe(code) -> tuple:
+    """
+    Runs a probe in a fresh interpreter.
+
+    Returns:
+        tuple: The probe's JSON output and the process's wall time in seconds.
+
+    Raises:
+        RuntimeError: If the probe crashed.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "probe failed")
+    return json.loads(result.stdout.strip().splitlines()[-1]), wall
+
+
+def measure(runs) -> dict:
+    """
+    Measures the startup metrics, keeping the median of several runs.
+
+    Returns:
+        dict: Seconds per metric, plus the heavy modules imported eagerly.
+    """
+    imports, processes, frames, heavy = [], [], [], set()
+    frame_error = None
+
+    # One untimed run so every run reads compiled bytecode
+    run_probe(IMPORT_PROBE)
+
+    for _ in range(runs):
+        output, wall = run_probe(IMPORT_PROBE)
+        imports.append(output["seconds"])
+        processes.append(wall)
+        heavy.update(output["heavy"])
+
+        if frame_error is None:
+            output, _ = run_probe(FRAME_PROBE)
+            if "error" in output:
+                frame_error = output["error"]
+            else:
+                frames.append(output["seconds"])
+
+    results = {
+        "import": statistics.median(imports),
+        "process": statistics.median(processes),
+        "heavy": sorted(heavy),
+    }
+    if frames:
+        results["first_frame"] = statistics.median(frames)
+    elif frame_error:
+        print(f"first_frame skipped: {frame_error}")
+    return results
+
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Compares a run with the baseline.
+
+    Returns:
+        list: A message for every regression, empty if there are none.
+    """
+    problems = []
+    for metric, seconds in results.items():
+        if metric == "heavy" or metric not in baseline:
+            continue
+        limit = baseline[metric] * (1 + tolerance)
+        if seconds > limit:
+            problems.append(f"{metric}: {seconds * 1000:.1f} ms, baseline {baseline[metric] * 1000:.1f} ms")
+
+    if results["heavy"]:
+        problems.append(f"imported before the login window: {', '.join(results['heavy'])}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the Quiz Game's startup time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--baseline", default=os.path.join(HERE, "startup_baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    for metric, seconds in results.items():
+        if metric != "heavy":
+            print(f"{metric:12} {seconds * 1000:8.1f} ms")
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+        print("No baseline yet, run with --save to record one.")
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
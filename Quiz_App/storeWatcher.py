@@ -0,0 +1,206 @@
+"""
+storeWatcher.py
+----------------------
+This module defines the StoreWatcher class, which tells a screen when the
+users database changed so it can update itself without a Refresh button.
+
+On Linux the store's directory is watched with inotify (through ctypes,
+so no extra package is needed) and the Tk event loop is woken only when
+one of the store's files is written; nothing runs while the scores stand
+still. Elsewhere, or if inotify can't be set up, the files' modification
+time and size are compared every LIVE_POLL_INTERVAL_MS with after(),
+which costs one stat() per file. A store that isn't kept in local files
+(the "remote" backend) is simply re-read every REMOTE_POLL_INTERVAL_MS,
+since each check there is a request to the server.
+
+Bursts of writes, such as a journal append followed by a compaction, are
+reported as one change.
+
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import tkinter
+from config import LIVE_POLL_INTERVAL_MS, REMOTE_POLL_INTERVAL_MS
+
+# Milliseconds to wait after a change for the writes that come with it
+DEBOUNCE_MS = 200
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: wd, mask, cookie, len, then len bytes of name
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    """Returns libc if it provides inotify, else None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class StoreWatcher:
+    """
+    StoreWatcher calls back on the Tk thread when the users database changes.
+
+    Attributes:
+        widget: The Tk widget used to schedule callbacks.
+        paths (list): The files holding the users.
+        on_change (callable): Called with no arguments after a change.
+        mode (str): "inotify", "poll" or "timer" once started, else None.
+    """
+
+    def __init__(self, widget, paths, on_change, interval_ms=LIVE_POLL_INTERVAL_MS,
+                 timer_interval_ms=REMOTE_POLL_INTERVAL_MS):
+        """
+        Initializes the watcher without starting it.
+
+        Args:
+            widget: Any Tk widget, used to schedule the callbacks.
+            paths (list): The files holding the users, from UserStore.files().
+                If empty, on_change is called every timer_interval_ms instead.
+            on_change (callable): Called on the Tk thread after a change.
+            interval_ms (int): Milliseconds between checks when polling.
+                Defaults to LIVE_POLL_INTERVAL_MS from config.py.
+            timer_interval_ms (int): Milliseconds between calls when there
+                are no files to watch. Defaults to REMOTE_POLL_INTERVAL_MS.
+        """
+        self.widget = widget
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.interval_ms = interval_ms
+        self.timer_interval_ms = timer_interval_ms
+        self.mode = None
+        self._fd = None
+        self._names = set()
+        self._poll_job = None
+        self._debounce_job = None
+        self._signature = None
+
+    def start(self):
+        """Starts watching, with inotify if possible."""
+        if self.mode is not None:
+            return self
+        if not self.paths:
+            self.mode = "timer"
+        elif self._start_inotify():
+            self.mode = "inotify"
+        else:
+            self.mode = "poll"
+            self._signature = self._files_signature()
+
+        if self.mode != "inotify":
+            self._poll_job = self.widget.after(self._interval(), self._poll)
+        return self
+
+    def stop(self):
+        """Stops watching. No callback is made after this returns."""
+        if self._fd is not None:
+            self.widget.tk.deletefilehandler(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        for job in (self._poll_job, self._debounce_job):
+            if job is not None:
+                self.widget.after_cancel(job)
+        self._poll_job = None
+        self._debounce_job = None
+        self.mode = None
+
+    def _start_inotify(self) -> bool:
+        """Watches the store's directories with inotify. Returns False if that isn't possible."""
+        libc = _load_libc()
+        if libc is None or not hasattr(self.widget.tk, "createfilehandler"):
+            return False
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+
+        # Directories are watched rather than the files, since the snapshot is
+        # replaced by a rename and the journal is deleted on every compaction
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                return False
+
+        self._fd = fd
+        self._names = {os.fsencode(os.path.basename(path)) for path in self.paths}
+        self.widget.tk.createfilehandler(fd, tkinter.READABLE, self._on_readable)
+        return True
+
+    def _on_readable(self, fd, mask):
+        if self._read_events():
+            self._schedule()
+
+    def _read_events(self) -> bool:
+        """Drains the pending inotify events. Returns True if one concerned the store's files."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW or name in self._names:
+                    changed = True
+
+    def _files_signature(self):
+        """Returns the (mtime, size) of every watched file, None for missing ones."""
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _interval(self) -> int:
+        return self.timer_interval_ms if self.mode == "timer" else self.interval_ms
+
+    def _poll(self):
+        self._poll_job = self.widget.after(self._interval(), self._poll)
+        if self.mode == "timer":
+            self.on_change()
+            return
+
+        signature = self._files_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._schedule()
+
+    def _schedule(self):
+        """Reports a change once the writes that came with it are done."""
+        if self._debounce_job is None:
+            self._debounce_job = self.widget.after(DEBOUNCE_MS, self._fire)
+
+    def _fire(self):
+        self._debounce_job = None
+        if self.mode == "poll":
+            self._signature = self._files_signature()
+        self.on_change()
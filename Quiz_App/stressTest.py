@@ -0,0 +1,154 @@
+"""
+stressTest.py
+----------------------
+A stress test for concurrent writes to the users database.
+
+Several processes sign up users and add points to shared users at the same
+time, against a scratch copy of the database. Afterwards every user and
+every point must be accounted for. The journal compaction threshold is kept
+low so compactions race with the writers as well.
+
+With --backend remote, a quiz server is started in this process over a
+scratch JSON database and every worker thread is a separate client of it,
+so --processes 8 --threads 50 plays 400 sessions at once. The server only
+lets a client add points to the user it signed up as, so there the shared
+users get no points.
+
+Usage:
+    python stressTest.py [--backend json|sqlite|sharded|remote] [--processes 8] [--threads 1] [--rounds 200]
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from userStore import JsonUserStore
+
+SHARED_USERS = ["shared0", "shared1", "shared2"]
+
+
+def open_store(backend, path):
+    """Opens the store under test in the calling process. For "remote", path is "host:port"."""
+    if backend == "json":
+        return JsonUserStore(path, compact_threshold=50)
+    if backend == "sharded":
+        from shardedUserStore import ShardedUserStore
+        return ShardedUserStore(path, compact_threshold=50)
+    if backend == "remote":
+        from remoteStore import RemoteConnection, RemoteUserStore
+        host, port = path.rsplit(":", 1)
+        return RemoteUserStore(RemoteConnection(host, int(port)))
+    from sqliteUserStore import SqliteUserStore
+    return SqliteUserStore(path)
+
+
+def play(backend, path, player, rounds):
+    """Signs up one user per round and adds one point to them and, except over the quiz server, to a shared user."""
+    store = open_store(backend, path)
+    for i in range(rounds):
+        username = f"{player}-u{i}"
+        store.add({"username": username, "password": "x", "points": 0})
+        increments = {username: 1}
+        if backend != "remote":
+            increments[SHARED_USERS[i % len(SHARED_USERS)]] = 1
+        store.add_points(increments)
+
+
+def worker(backend, path, worker_id, threads, rounds):
+    """Runs one player per thread, each with its own store."""
+    errors = []
+
+    def run_player(player):
+        try:
+            play(backend, path, player, rounds)
+        except Exception as e:
+            errors.append(e)
+
+    players = [threading.Thread(target=run_player, args=(f"w{worker_id}t{t}",)) for t in range(threads)]
+    for player in players:
+        player.start()
+    for player in players:
+        player.join()
+    if errors:
+        raise errors[0]
+
+
+def run(backend, processes, threads, rounds) -> bool:
+    """
+    Runs the stress test and prints the outcome.
+
+    Returns:
+        bool: True if no user or point was lost.
+    """
+    workdir = tempfile.mkdtemp(prefix="quiz-stress-")
+    server = None
+    try:
+        path = os.path.join(workdir, {"sqlite": "users.db", "sharded": "shards"}.get(backend, "users.json"))
+        if backend in ("json", "remote"):
+            with open(path, "w") as file:
+                file.write('{"data": []}')
+
+        # The server's event loop runs in a thread, so workers are spawned rather than forked
+        context = multiprocessing.get_context("spawn" if backend == "remote" else None)
+        address = path
+        if backend == "remote":
+            from quizServer import QuizServer
+            server = QuizServer(JsonUserStore(path, compact_threshold=50), "127.0.0.1", 0)
+            server.start_in_thread()
+            address = f"127.0.0.1:{server.port}"
+
+        store = open_store(backend, address)
+        for username in SHARED_USERS:
+            store.add({"username": username, "password": "x", "points": 0})
+
+        jobs = [context.Process(target=worker, args=(backend, address, n, threads, rounds)) for n in range(processes)]
+        started = time.perf_counter()
+        for job in jobs:
+            job.start()
+        for job in jobs:
+            job.join()
+        elapsed = time.perf_counter() - started
+
+        failed = [job for job in jobs if job.exitcode != 0]
+        if server is not None:
+            # Writes the batched points still pending, then checks the database itself
+            server.stop_thread()
+            server = None
+        store = open_store("json" if backend == "remote" else backend, path)
+        users = store.users()
+        written = processes * threads * rounds
+        expected_users = len(SHARED_USERS) + written
+        expected_shared = 0 if backend == "remote" else written
+        shared_points = sum(store.get(username)["points"] for username in SHARED_USERS)
+        own_points = sum(user["points"] for user in users) - shared_points
+
+        print(f"backend:       {backend}")
+        print(f"users:         {len(users)} / {expected_users}")
+        print(f"shared points: {shared_points} / {expected_shared}")
+        print(f"user points:   {own_points} / {written}")
+        print(f"time:          {elapsed:.2f} s")
+
+        return (not failed and len(users) == expected_users
+                and shared_points == expected_shared and own_points == written)
+    finally:
+        if server is not None:
+            server.stop_thread()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress test concurrent users database writes.")
+    parser.add_argument("--backend", choices=["json", "sqlite", "sharded", "remote"], default="json")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=1, help="players per process")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    ok = run(args.backend, args.processes, args.threads, args.rounds)
+    print("OK: no updates lost" if ok else "FAILED: updates were lost")
+    sys.exit(0 if ok else 1)
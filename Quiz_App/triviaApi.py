@@ -0,0 +1,269 @@
+"""
+triviaApi.py
+----------------------
+This module talks to the Open Trivia Database API through a shared
+TriviaClient.
+
+The client keeps a pooled keep-alive requests.Session, spaces its calls
+to respect the API's per-IP rate limit, merges identical requests that
+are already in flight, and retries with exponential backoff when the API
+answers "rate limit" (response code 5) or the connection fails. The API
+address comes from config.py, so the client can be pointed at a local
+stub server.
+
+Question requests made for a user carry that user's session token, which
+is requested, renewed and reset automatically, and the questions the user
+has already seen are filtered out of every response.
+
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from requests.adapters import HTTPAdapter
+from config import TRIVIA_API_URL, TRIVIA_RATE_LIMIT_INTERVAL, TRIVIA_MAX_RETRIES
+from metrics import get_metrics
+from question import Question
+from questionHistory import get_history
+
+# Seconds to wait for the API before giving up
+REQUEST_TIMEOUT = 5
+
+# Response code the API sends when requests come in too fast
+RATE_LIMITED = 5
+
+# The API's categories, in id order starting at 9
+categories = [
+    "General Knowledge", "Entertainment: Books", "Entertainment: Film",
+    "Entertainment: Music", "Entertainment: Musicals & Theatres", "Entertainment: Television",
+    "Entertainment: Video Games", "Entertainment: Board Games", "Science & Nature",
+    "Science: Computers", "Science: Mathematics", "Mythology", "Sports", "Geography",
+    "History", "Politics", "Art", "Celebrities", "Animals", "Vehicles",
+    "Entertainment: Comics", "Science: Gadgets", "Entertainment: Japanese Anime & Manga",
+    "Entertainment: Cartoon & Animations"
+]
+
+
+class RateLimitError(OSError):
+    """
+    Raised when the API kept answering "rate limit" after every retry.
+
+    Like a connection error, it means the API can't be used right now, not
+    that the request was wrong, so callers fall back to cached questions.
+    """
+
+
+class TriviaClient:
+    """
+    TriviaClient sends rate-limited, de-duplicated requests to the API.
+
+    Attributes:
+        api_url (str): Base URL of the API, without a trailing slash.
+        min_interval (float): Minimum seconds between two requests.
+        max_retries (int): Retries after a rate-limited or failed request.
+    """
+
+    def __init__(self, api_url=TRIVIA_API_URL, min_interval=TRIVIA_RATE_LIMIT_INTERVAL,
+                 max_retries=TRIVIA_MAX_RETRIES):
+        """
+        Initializes the client and its connection pool.
+
+        Args:
+            api_url (str): Base URL of the API.
+            min_interval (float): Minimum seconds between two requests.
+            max_retries (int): Retries after a rate-limited or failed request.
+        """
+        self.api_url = api_url.rstrip("/")
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._turn = threading.Condition()
+        self._next_slot = 0.0
+        self._foreground_waiting = 0
+
+    def get_json(self, path, params, background=False) -> dict:
+        """
+        Sends a GET request and returns the decoded JSON response.
+
+        If the same request is already in flight, waits for it and shares
+        its response instead of sending another one.
+
+        Args:
+            path (str): Endpoint path, e.g. "api.php".
+            params (dict): Query parameters.
+            background (bool): Let requests made for the user go first.
+                Defaults to False.
+
+        Returns:
+            dict: The JSON response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request kept failing.
+            RateLimitError: If the API kept answering "rate limit".
+        """
+        key = (path, tuple(sorted(params.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            data = self._send(path, params, background)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def request_token(self) -> str:
+        """Requests a new session token from the API."""
+        return self.get_json("api_token.php", {"command": "request"})["token"]
+
+    def reset_token(self, token) -> str:
+        """Resets an exhausted session token so it can serve every question again."""
+        return self.get_json("api_token.php", {"command": "reset", "token": token}).get("token", token)
+
+    def fetch_questions(self, category_id, difficulty, amount=10, q_type="multiple", owner=None,
+                        background=False) -> list:
+        """
+        Requests a set of questions from the API.
+
+        Args:
+            category_id (int): The API's category id.
+            difficulty (str): "easy", "medium" or "hard".
+            amount (int): Number of questions to request. Defaults to 10.
+            q_type (str): "multiple" or "boolean". Defaults to "multiple".
+            owner (str, optional): The user the questions are for. Their
+                session token is sent and the questions they have seen are
+                dropped. Defaults to None.
+            background (bool): Let requests made for the user go first.
+                Defaults to False.
+
+        Returns:
+            list: The decoded Question records. With an owner, only those the
+            owner hasn't seen yet, so there may be fewer than amount.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+            ValueError: If the API answered with an error response code.
+            KeyError: If the response has an unexpected format.
+        """
+        params = {"amount": amount, "category": category_id, "difficulty": difficulty, "type": q_type}
+        history = get_history() if owner is not None else None
+
+        if history is not None:
+            params["token"] = history.token(owner) or self._new_token(owner)
+
+        data = self.get_json("api.php", params, background)
+
+        # Renew a token the API forgot, or reset one that ran out of questions, then try once more
+        if history is not None and data.get("response_code") in (3, 4):
+            if data["response_code"] == 3:
+                params["token"] = self._new_token(owner)
+            else:
+                params["token"] = self.reset_token(params["token"])
+                history.set_token(owner, params["token"])
+            data = self.get_json("api.php", params, background)
+
+        if "response_code" in data:
+            code = data["response_code"]
+            if code == 1:
+                raise ValueError("No Results: No questions found for the given parameters.")
+            elif code == 2:
+                raise ValueError("Invalid Parameter: Check your query parameters.")
+            elif code == 3:
+                raise ValueError("Token Not Found: Your session token is invalid.")
+            elif code == 4:
+                raise ValueError("Token Empty: Your session token has expired, reset it.")
+
+        questions = [Question.from_api(q, category_id) for q in data["results"]]
+        if history is not None:
+            history.touch_token(owner)
+            questions = history.filter_unseen(owner, questions)
+        return questions
+
+    def _new_token(self, owner) -> str:
+        token = self.request_token()
+        get_history().set_token(owner, token)
+        return token
+
+    def _send(self, path, params, background):
+        """Sends one request, retrying with backoff on rate limits and connection errors."""
+        metrics = get_metrics()
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            with metrics.timer("api.wait"):
+                self._wait_turn(background)
+            try:
+                with metrics.timer("api.request"):
+                    response = self.session.get(f"{self.api_url}/{path}", params=params, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 429:
+                    raise RateLimitError("Rate Limit: Too many requests, try again later.")
+                data = response.json()
+                if data.get("response_code") == RATE_LIMITED:
+                    raise RateLimitError("Rate Limit: Too many requests, try again later.")
+                return data
+            except (RateLimitError, requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                metrics.count("api.failed_attempts")
+                if last_attempt:
+                    raise
+            time.sleep(self.min_interval * 2 ** attempt)
+
+    def _wait_turn(self, background):
+        """
+        Blocks until the next request slot, keeping min_interval between requests.
+
+        Background requests wait while any foreground request is waiting.
+        """
+        with self._turn:
+            if not background:
+                self._foreground_waiting += 1
+            try:
+                while True:
+                    if background and self._foreground_waiting:
+                        self._turn.wait()
+                        continue
+
+                    delay = self._next_slot - time.monotonic()
+                    if delay <= 0:
+                        self._next_slot = time.monotonic() + self.min_interval
+                        return
+                    self._turn.wait(delay)
+            finally:
+                if not background:
+                    self._foreground_waiting -= 1
+                    self._turn.notify_all()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> TriviaClient:
+    """Returns the API client shared by the whole process, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TriviaClient()
+        return _client
+
+
+def fetch_questions(category_id, difficulty, amount=10, q_type="multiple", owner=None, background=False) -> list:
+    """Requests a set of questions through the shared client. See TriviaClient.fetch_questions."""
+    return get_client().fetch_questions(category_id, difficulty, amount, q_type, owner, background)
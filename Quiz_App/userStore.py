@@ -0,0 +1,770 @@
+"""
+userStore.py
+----------------------
+This module defines the UserStore interface that the login, signup, game
+and leaderboard screens use to read and update users, and its JSON backend.
+The backend is chosen with STORAGE_BACKEND in config.py; the SQLite
+backend lives in sqliteUserStore.py, the sharded JSON backend in
+shardedUserStore.py and the client of the shared quiz server in
+remoteStore.py.
+
+The JSON database is a base snapshot (users.json) plus an append-only journal
+of user events (users.json.journal). Signups and score updates append one
+line to the journal instead of rewriting the snapshot, so a write costs the
+same no matter how many users exist. Loading replays the journal on top of
+the snapshot, and once the journal grows past a threshold it is compacted
+back into the snapshot.
+
+Users are kept in a dictionary keyed by username, so lookups, existence
+checks and inserts are O(1). The files are re-read only when their
+modification time or size changes on disk, and a journal that only grew
+is caught up by replaying the new lines.
+
+A login right after startup doesn't need every user in memory: until the
+store is loaded for something else, its first few single-user reads
+search the snapshot for the quoted username in fixed-size chunks and
+decode only the record found, then replay that user's journal events.
+This reads the bytes once at most, never builds the other users' records,
+and uses the same memory however large the file grows.
+
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from config import USERS_FILE, JOURNAL_COMPACT_THRESHOLD, STORAGE_BACKEND, SQLITE_FILE, SHARDS_DIR, SHARD_COUNT
+from fileLock import FileLock, atomic_write
+from metrics import get_metrics
+from passwords import hash_password, needs_rehash, verify_password
+from ranking import RankIndex
+
+# How many times a write is rebuilt when the journal changed under it
+WRITE_RETRIES = 5
+
+# Single-user reads answered by scanning the files before a store loads every user
+STREAMING_LOOKUPS = 3
+
+# Bytes of the snapshot searched at a time by a single-user read
+SCAN_CHUNK_SIZE = 1 << 20
+
+# Bytes read at first when decoding one record found in the snapshot, and at most
+RECORD_READ_SIZE = 4096
+MAX_RECORD_SIZE = 1 << 16
+
+GENERATION_PATTERN = re.compile(rb'"generation"\s*:\s*(\d+)')
+
+_decoder = json.JSONDecoder()
+
+
+class UserExistsError(ValueError):
+    """Raised when signing up a username that is already taken."""
+
+
+class UserStore:
+    """
+    UserStore is the interface every users storage backend implements.
+
+    User records are dictionaries with "username", "password" and "points"
+    keys. The password is a hash from passwords.py, or the plaintext password
+    for users who haven't logged in since hashing was added.
+    """
+
+    def get(self, username):
+        """
+        Looks up a user by username.
+
+        Args:
+            username (str): The username to look up.
+
+        Returns:
+            dict: The user's record, or None if there is no such user.
+        """
+        raise NotImplementedError
+
+    def exists(self, username) -> bool:
+        """Returns True if a user with the given username exists."""
+        raise NotImplementedError
+
+    def authenticate(self, username, password):
+        """
+        Checks a user's credentials.
+
+        A plaintext or outdated password hash is replaced with a new hash
+        once the password was found to match, through the store's
+        set_password(username, password_hash). Stores that check passwords
+        elsewhere, like RemoteUserStore, override this method and need no
+        set_password. This hashes the password, so it must not be called
+        on the Tk thread.
+
+        Args:
+            username (str): The username entered.
+            password (str): The password entered.
+
+        Returns:
+            dict: The user's record, or None if the credentials don't match.
+        """
+        user = self.get(username)
+        if user is None or not verify_password(password, user["password"]):
+            return None
+
+        if needs_rehash(user["password"]):
+            try:
+                self.set_password(username, hash_password(password))
+            except OSError as e:
+                print(f"Could not upgrade the stored password of {username}: {e}")
+        return user
+
+    def create_user(self, username, password) -> dict:
+        """
+        Signs up a new user with a hashed password and no points.
+
+        This hashes the password, so it must not be called on the Tk thread.
+
+        Args:
+            username (str): The new username.
+            password (str): The new user's password.
+
+        Returns:
+            dict: The new user's record.
+
+        Raises:
+            UserExistsError: If the username is already taken.
+        """
+        if self.exists(username):
+            raise UserExistsError(f"Username already exists: {username}")
+
+        user = {"username": username, "password": hash_password(password), "points": 0}
+        self.add(user)
+        return user
+
+    def users(self) -> list:
+        """Returns the records of all users, in signup order."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Returns the number of registered users."""
+        raise NotImplementedError
+
+    def top(self, n) -> list:
+        """
+        Returns the users with the most points.
+
+        Args:
+            n (int): The maximum number of users to return.
+
+        Returns:
+            list: Up to n user records, highest points first.
+        """
+        return self.ranked(0, n)
+
+    def ranked(self, start, stop) -> list:
+        """
+        Returns a slice of the leaderboard.
+
+        Users are ordered by points, highest first, and then by username.
+
+        Args:
+            start (int): 0-based position of the first user.
+            stop (int): 0-based position after the last user.
+
+        Returns:
+            list: The user records at those positions.
+        """
+        raise NotImplementedError
+
+    def rank(self, username):
+        """
+        Returns a user's 1-based leaderboard rank, or None if there is no such user.
+        """
+        raise NotImplementedError
+
+    def count_ahead(self, points, username) -> int:
+        """
+        Returns how many users rank ahead of a position on the leaderboard.
+
+        Args:
+            points (int): The points at that position.
+            username (str): The username at that position; it needn't exist here.
+        """
+        raise NotImplementedError
+
+    def around(self, rank, radius) -> list:
+        """
+        Returns the users ranked near a given rank.
+
+        Args:
+            rank (int): The 1-based rank in the middle.
+            radius (int): How many ranks to include on each side.
+
+        Returns:
+            list: (rank, user record) pairs.
+        """
+        start = max(rank - 1 - radius, 0)
+        users = self.ranked(start, rank + radius)
+        return [(start + i + 1, user) for i, user in enumerate(users)]
+
+    def add(self, user):
+        """
+        Inserts a new user.
+
+        Args:
+            user (dict): The new user's record, with a unique "username".
+
+        Raises:
+            UserExistsError: If the username is already taken.
+        """
+        raise NotImplementedError
+
+    def add_points(self, increments):
+        """
+        Adds points to several users in a single write.
+
+        Args:
+            increments (dict): Maps each username to the points to add.
+        """
+        raise NotImplementedError
+
+    def files(self) -> list:
+        """
+        Returns the files the users are kept in, so screens can watch them for changes.
+
+        Returns:
+            list: File paths, some of which may not exist yet. Empty if the
+            store isn't kept in local files.
+        """
+        return []
+
+
+class JsonUserStore(UserStore):
+    """
+    JsonUserStore keeps the users database in memory, indexed by username.
+
+    Every mutation runs under an advisory file lock: the store first catches
+    up with changes made by other processes, then appends its event to the
+    journal and fsyncs it. The snapshot is only ever replaced atomically, and
+    it records a generation number so that journal events already folded into
+    it are skipped if a compaction was interrupted before the old journal was
+    removed.
+
+    Screens read and write the store from worker threads, so the in-memory
+    state is only touched while holding a thread lock. Writers take the file
+    lock first and the thread lock inside it; readers take only the thread
+    lock.
+
+    Attributes:
+        path (str): Path to the JSON snapshot holding the users.
+        journal_path (str): Path to the append-only journal of user events.
+        compact_threshold (int): Number of journal events that triggers a compaction.
+    """
+
+    def __init__(self, path=USERS_FILE, compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        """
+        Initializes an empty store. The files are read on first access.
+
+        Args:
+            path (str): Path to the JSON users snapshot.
+            compact_threshold (int): Number of journal events that triggers a compaction.
+        """
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_threshold = compact_threshold
+        self._lock = FileLock(path + ".lock")
+        self._state_lock = threading.RLock()
+        self._data = []
+        self._index = {}
+        self._ranking = RankIndex()
+        self._generation = 0
+        self._signature = None
+        self._journal_offset = 0
+        self._journal_events = 0
+        self._streamed_lookups = 0
+
+    def _file_signature(self, path):
+        """Returns the (mtime, size) pair of a file, or None if it does not exist."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        """
+        Brings the in-memory users up to date with the files on disk.
+
+        The snapshot is only reparsed when it changed. If only the journal
+        grew, the new events are replayed on top of the current state.
+
+        Raises:
+            FileNotFoundError: If the users snapshot does not exist.
+            json.JSONDecodeError: If the users snapshot is not valid JSON.
+        """
+        with self._state_lock:
+            snapshot = self._file_signature(self.path)
+            if snapshot is None:
+                raise FileNotFoundError(self.path)
+
+            journal = self._file_signature(self.journal_path)
+            if self._signature is not None and snapshot == self._signature[0]:
+                if journal == self._signature[1]:
+                    return
+                if journal is not None and journal[1] >= self._journal_offset:
+                    self._replay_journal()
+                    self._signature = snapshot, journal
+                    return
+
+            with get_metrics().timer("store.load"):
+                with open(self.path, "r") as file:
+                    json_data = json.load(file)
+
+                self._data = json_data.get("data", [])
+                self._index = {user["username"]: user for user in self._data}
+                self._ranking.rebuild((user["username"], user["points"]) for user in self._data)
+                self._generation = json_data.get("generation", 0)
+                self._journal_offset = 0
+                self._journal_events = 0
+                self._replay_journal()
+            self._signature = snapshot, journal
+
+    def _replay_journal(self):
+        """Applies the journal events written after the last replayed offset."""
+        try:
+            with open(self.journal_path, "rb") as file:
+                file.seek(self._journal_offset)
+                for line in file:
+                    # A line without a newline is a write still in progress
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        event = json.loads(line)
+                        # Events from before the last compaction are already in the snapshot
+                        if event.get("gen", 0) >= self._generation:
+                            self._apply(event)
+                    except (ValueError, KeyError):
+                        print(f"Skipping corrupt journal entry: {line!r}")
+                    self._journal_offset += len(line)
+                    self._journal_events += 1
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, event):
+        """
+        Applies a single journal event to the in-memory users.
+
+        Args:
+            event (dict): A "create" event holding a new user, a "points"
+                event mapping usernames to points to add, or a "password"
+                event replacing a user's password.
+        """
+        if event["op"] == "create":
+            user = event["user"]
+            if user["username"] not in self._index:
+                self._data.append(user)
+                self._index[user["username"]] = user
+                self._ranking.update(user["username"], user["points"])
+        elif event["op"] == "points":
+            for username, points in event["increments"].items():
+                user = self._index.get(username)
+                if user is not None:
+                    user["points"] += points
+                    self._ranking.update(username, user["points"])
+        elif event["op"] == "password":
+            user = self._index.get(event["username"])
+            if user is not None:
+                user["password"] = event["password"]
+
+    def _mutate(self, make_event):
+        """
+        Records a change in the journal and applies it in memory.
+
+        The change is built from up-to-date state while holding the file lock.
+        If the journal still changed before the event could be appended (for
+        example on a file system that ignores advisory locks), the state is
+        refreshed and the change rebuilt, up to WRITE_RETRIES times.
+
+        Args:
+            make_event (callable): Builds the event from the current state.
+                It may raise ValueError to reject the change.
+
+        Raises:
+            TimeoutError: If the journal kept changing on every attempt.
+        """
+        metrics = get_metrics()
+        for attempt in range(WRITE_RETRIES):
+            with metrics.timer("store.write"), self._lock, self._state_lock:
+                self._refresh()
+                self._discard_torn_tail()
+                event = make_event()
+                event["gen"] = self._generation
+
+                if self._append(event):
+                    self._apply(event)
+                    if self._journal_events >= self.compact_threshold:
+                        self.compact()
+                    return
+
+            metrics.count("store.write_retries")
+            time.sleep(0.01 * 2 ** attempt)
+
+        raise TimeoutError(f"{self.journal_path} kept changing, giving up")
+
+    def _discard_torn_tail(self):
+        """Cuts off a partial last line left in the journal by a crashed writer."""
+        journal = self._signature[1]
+        if journal is not None and journal[1] > self._journal_offset:
+            with open(self.journal_path, "r+b") as file:
+                file.truncate(self._journal_offset)
+            self._signature = self._signature[0], self._file_signature(self.journal_path)
+
+    def _append(self, event) -> bool:
+        """
+        Appends an event to the journal and flushes it to disk.
+
+        Args:
+            event (dict): The event to record.
+
+        Returns:
+            bool: False if the journal changed since the last refresh, in
+            which case nothing was written.
+        """
+        if self._file_signature(self.journal_path) != self._signature[1]:
+            return False
+
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode()
+        with open(self.journal_path, "ab") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._journal_offset += len(line)
+        self._journal_events += 1
+        self._signature = self._signature[0], self._file_signature(self.journal_path)
+        return True
+
+    def compact(self):
+        """Folds the journal into the snapshot and starts a new, empty journal."""
+        with get_metrics().timer("store.compact"), self._lock, self._state_lock:
+            self._refresh()
+
+            self._generation += 1
+            atomic_write(self.path, json.dumps({"generation": self._generation, "data": self._data}, indent=4))
+
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+            self._journal_offset = 0
+            self._journal_events = 0
+            self._signature = self._file_signature(self.path), None
+
+    def lookup(self, username):
+        """
+        Finds one user by scanning the files instead of loading every user.
+
+        Args:
+            username (str): The username to look up.
+
+        Returns:
+            dict: A copy of the user's record, or None if there is no such user.
+
+        Raises:
+            FileNotFoundError: If the users snapshot does not exist.
+            json.JSONDecodeError: If the users snapshot is empty.
+        """
+        with get_metrics().timer("store.lookup"):
+            for _ in range(WRITE_RETRIES):
+                before = self._file_signature(self.path)
+                if before is None:
+                    raise FileNotFoundError(self.path)
+
+                generation, user = _scan_snapshot(self.path, username)
+                user = self._replay_for(user, username, generation)
+
+                # A compaction replaces the snapshot before it removes the journal,
+                # so an unchanged snapshot means the journal read matched it
+                if self._file_signature(self.path) == before:
+                    return user
+
+        with self._state_lock:
+            self._refresh()
+            return self._index.get(username)
+
+    def _replay_for(self, user, username, generation):
+        """Applies the journal events about one user to a copy of their record."""
+        needles = _needles(username)
+        try:
+            with open(self.journal_path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    if not any(needle in line for needle in needles):
+                        continue
+                    try:
+                        event = json.loads(line)
+                        if event.get("gen", 0) < generation:
+                            continue
+                        if event["op"] == "create" and user is None and event["user"]["username"] == username:
+                            user = dict(event["user"])
+                        elif event["op"] == "points" and user is not None:
+                            user["points"] += event["increments"].get(username, 0)
+                        elif event["op"] == "password" and user is not None and event["username"] == username:
+                            user["password"] = event["password"]
+                    except (ValueError, KeyError):
+                        pass
+        except FileNotFoundError:
+            pass
+        return user
+
+    def _should_stream(self) -> bool:
+        """Returns True if a single-user read should scan the files rather than load them."""
+        with self._state_lock:
+            if self._signature is not None or self._streamed_lookups >= STREAMING_LOOKUPS:
+                return False
+            self._streamed_lookups += 1
+            return True
+
+    def files(self) -> list:
+        return [self.path, self.journal_path]
+
+    def get(self, username):
+        if self._should_stream():
+            return self.lookup(username)
+        with self._state_lock:
+            self._refresh()
+            return self._index.get(username)
+
+    def exists(self, username) -> bool:
+        if self._should_stream():
+            return self.lookup(username) is not None
+        with self._state_lock:
+            self._refresh()
+            return username in self._index
+
+    def users(self) -> list:
+        with self._state_lock:
+            self._refresh()
+            return list(self._data)
+
+    def count(self) -> int:
+        with self._state_lock:
+            self._refresh()
+            return len(self._data)
+
+    def ranked(self, start, stop) -> list:
+        with self._state_lock:
+            self._refresh()
+            return [self._index[username] for username, _ in self._ranking.ranked(start, stop)]
+
+    def rank(self, username):
+        with self._state_lock:
+            self._refresh()
+            return self._ranking.rank(username)
+
+    def count_ahead(self, points, username) -> int:
+        with self._state_lock:
+            self._refresh()
+            return self._ranking.count_ahead(points, username)
+
+    def add(self, user):
+        """Inserts a new user and records it in the journal."""
+        def make_event():
+            if user["username"] in self._index:
+                raise UserExistsError(f"Username already exists: {user['username']}")
+            return {"op": "create", "user": user}
+
+        self._mutate(make_event)
+
+    def add_points(self, increments):
+        """Adds points to several users and records them as one journal event."""
+        self._mutate(lambda: {"op": "points", "increments": dict(increments)})
+
+    def set_password(self, username, password_hash):
+        """Replaces a user's password and records it in the journal."""
+        self._mutate(lambda: {"op": "password", "username": username, "password": password_hash})
+
+
+def _needles(username) -> list:
+    """Returns the ways a username can be written as a JSON string."""
+    needles = [json.dumps(username).encode()]
+    unescaped = json.dumps(username, ensure_ascii=False).encode()
+    if unescaped != needles[0]:
+        needles.append(unescaped)
+    return needles
+
+
+def _scan_snapshot(path, username):
+    """
+    Finds one user in a users snapshot without parsing the other users.
+
+    Returns:
+        tuple: The snapshot's generation, and the user's record or None.
+    """
+    needles = _needles(username)
+    # Keeps the end of each chunk, so a username cut by a chunk border is still found
+    overlap = max(len(needle) for needle in needles) - 1
+
+    with open(path, "rb") as file:
+        generation = _snapshot_generation(file)
+
+        offset = 0
+        tail = b""
+        while True:
+            file.seek(offset)
+            chunk = file.read(SCAN_CHUNK_SIZE)
+            if not chunk:
+                return generation, None
+
+            window = tail + chunk
+            window_start = offset - len(tail)
+            for needle in needles:
+                found = window.find(needle)
+                while found != -1:
+                    user = _record_around(file, window_start + found, username)
+                    if user is not None:
+                        return generation, user
+                    found = window.find(needle, found + 1)
+
+            offset += len(chunk)
+            tail = window[-overlap:] if overlap else b""
+
+
+def _snapshot_generation(file) -> int:
+    """Reads the generation number written before (or, in hand-edited files, after) the users."""
+    head = file.read(RECORD_READ_SIZE)
+    if not head:
+        raise json.JSONDecodeError("The users snapshot is empty", "", 0)
+
+    data_key = head.find(b'"data"')
+    match = GENERATION_PATTERN.search(head, 0, data_key if data_key != -1 else len(head))
+    if match is None:
+        file.seek(max(file.seek(0, os.SEEK_END) - RECORD_READ_SIZE, 0))
+        match = GENERATION_PATTERN.search(file.read())
+    return int(match.group(1)) if match else 0
+
+
+def _record_around(file, position, username):
+    """
+    Decodes the user record holding the username found at a position.
+
+    Candidate starts are the "{" bytes before the position, nearest first.
+    A "{" inside a string can't start an object with keys, since every
+    quote inside a JSON string is escaped, so the first candidate that
+    decodes to a user record is the enclosing record.
+
+    Returns:
+        dict: The record, or None if the match wasn't that user's username.
+    """
+    before_start = max(position - MAX_RECORD_SIZE, 0)
+    file.seek(before_start)
+    before = file.read(position - before_start)
+
+    start = before.rfind(b"{")
+    while start != -1:
+        record, end = _decode_at(file, before_start + start)
+        if isinstance(record, dict) and "username" in record:
+            return record if end > position and record["username"] == username else None
+        start = before.rfind(b"{", 0, start)
+    return None
+
+
+def _decode_at(file, start):
+    """Decodes the JSON value starting at a byte offset. Returns (value, end offset) or (None, None)."""
+    size = RECORD_READ_SIZE
+    while True:
+        file.seek(start)
+        data = file.read(size)
+        text = data.decode("utf-8", errors="replace")
+        try:
+            value, end = _decoder.raw_decode(text)
+            return value, start + len(text[:end].encode())
+        except json.JSONDecodeError:
+            if size >= MAX_RECORD_SIZE or len(data) < size:
+                return None, None
+            size *= 4
+
+
+class ScoreBuffer:
+    """
+    ScoreBuffer collects score increments in memory and writes them in one batch.
+
+    Attributes:
+        store (UserStore): The store the points are written to.
+    """
+
+    def __init__(self, store):
+        """
+        Initializes an empty buffer.
+
+        Args:
+            store (UserStore): The store the points are written to.
+        """
+        self.store = store
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, username, points):
+        """Buffers points for a user without touching the disk."""
+        with self._lock:
+            self._pending[username] = self._pending.get(username, 0) + points
+
+    def pending(self, username) -> int:
+        """Returns the points buffered for a user but not yet written."""
+        with self._lock:
+            return self._pending.get(username, 0)
+
+    def flush(self):
+        """
+        Writes all buffered points to the store in a single save.
+
+        It may run on a worker thread while points are still being added.
+        The points taken for the write are put back if it fails, so a
+        failed flush keeps them for the next attempt.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        try:
+            with get_metrics().timer("score.flush"):
+                self.store.add_points(batch)
+        except Exception:
+            with self._lock:
+                for username, points in batch.items():
+                    self._pending[username] = self._pending.get(username, 0) + points
+            raise
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(backend=STORAGE_BACKEND) -> UserStore:
+    """
+    Returns the shared store for a backend, creating it on first use.
+
+    Args:
+        backend (str): "json", "sqlite", "sharded" or "remote". Defaults to STORAGE_BACKEND from config.py.
+
+    Returns:
+        UserStore: The store shared by every screen in this process.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "json":
+                _stores[backend] = JsonUserStore(USERS_FILE)
+            elif backend == "sqlite":
+                from sqliteUserStore import SqliteUserStore
+                _stores[backend] = SqliteUserStore(SQLITE_FILE, import_from=USERS_FILE)
+            elif backend == "sharded":
+                from shardedUserStore import ShardedUserStore
+                _stores[backend] = ShardedUserStore(SHARDS_DIR, SHARD_COUNT, import_from=USERS_FILE)
+            elif backend == "remote":
+                from remoteStore import RemoteUserStore
+                _stores[backend] = RemoteUserStore()
+            else:
+                raise ValueError(f"Unknown storage backend: {backend}")
+        return _stores[backend]
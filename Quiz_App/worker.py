@@ -0,0 +1,84 @@
+"""
+worker.py
+----------------------
+This module defines the BackgroundTask class, which runs slow work such
+as network requests off the Tk main thread.
+
+The worker thread never touches widgets. Its result is put on a queue and
+picked up on the main thread by polling with after(), so the main loop
+never blocks waiting for it.
+
+"""
+
+import queue
+import threading
+
+# How often (in milliseconds) the main thread checks for a finished task
+POLL_INTERVAL_MS = 50
+
+
+class BackgroundTask:
+    """
+    BackgroundTask runs a function on a worker thread and reports back on the Tk thread.
+
+    Attributes:
+        cancelled (bool): True once cancel() was called. A cancelled task
+            still runs to completion, but its callbacks are never called.
+    """
+
+    def __init__(self, widget, func, on_done, on_error=None):
+        """
+        Initializes the task without starting it.
+
+        Args:
+            widget: Any Tk widget, used to schedule the polling.
+            func (callable): The function to run on the worker thread.
+            on_done (callable): Called on the Tk thread with func's return value.
+            on_error (callable, optional): Called on the Tk thread with the
+                exception if func raised. Defaults to None.
+        """
+        self.widget = widget
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+        self._results = queue.Queue(maxsize=1)
+        self._poll_job = None
+
+    def start(self):
+        """Starts the worker thread and begins polling for its result."""
+        threading.Thread(target=self._run, daemon=True).start()
+        self._poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        """Stops waiting for the result. The callbacks will not be called."""
+        self.cancelled = True
+        if self._poll_job is not None:
+            self.widget.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def running(self) -> bool:
+        """Returns True while the task was started and its result is not delivered yet."""
+        return self._poll_job is not None
+
+    def _run(self):
+        try:
+            self._results.put((True, self.func()))
+        except Exception as e:
+            self._results.put((False, e))
+
+    def _poll(self):
+        try:
+            ok, value = self._results.get_nowait()
+        except queue.Empty:
+            self._poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
+            return
+
+        self._poll_job = None
+        if self.cancelled:
+            return
+        if ok:
+            self.on_done(value)
+        elif self.on_error is not None:
+            self.on_error(value)